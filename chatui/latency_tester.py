@@ -1,10 +1,13 @@
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
+from requests.adapters import HTTPAdapter
 
 # ==== CONFIG ====
 URL = "http://localhost:8716/configure_strategies"  # <-- change this
 HEADERS = {"Content-Type": "application/json"}
+MAX_WORKERS = 8  # concurrent in-flight requests; lower if the server rate-limits
 
 # Only the "prompt" value changes
 PROMPTS = [
@@ -27,32 +30,52 @@ PROMPTS = [
     "optimize for maximum profit",
 ]
 
-# ==== MAIN LOOP ====
-results = []
+# One pooled session so keep-alive connections are reused across requests
+session = requests.Session()
+session.headers.update(HEADERS)
+session.mount("http://", HTTPAdapter(pool_maxsize=MAX_WORKERS))
+session.mount("https://", HTTPAdapter(pool_maxsize=MAX_WORKERS))
+
 
-for i, prompt in enumerate(PROMPTS, start=1):
+def send(prompt):
     body = {"prompt": prompt}
-    print(f"\n➡️  Sending request {i}/{len(PROMPTS)}: {body}")
-    start = time.time()
+    t0 = time.perf_counter_ns()
     try:
-        response = requests.post(URL, headers=HEADERS, json=body)
-        duration = round(time.time() - start, 3)  # seconds
+        response = session.post(URL, json=body)
+        t1 = time.perf_counter_ns()
+    except Exception as e:
+        t1 = time.perf_counter_ns()
+        return {
+            "prompt": prompt,
+            "status": None,
+            "time_s": (t1 - t0) / 1e9,
+            "error": str(e),
+        }
+    return {
+        "prompt": prompt,
+        "status": response.status_code,
+        "time_s": (t1 - t0) / 1e9,
+        "ok": response.ok,
+    }
+
+
+# ==== MAIN LOOP ====
+print(f"➡️  Sending {len(PROMPTS)} requests ({MAX_WORKERS} concurrent) to {URL}")
+wall_start = time.perf_counter_ns()
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    results = list(executor.map(send, PROMPTS))
+wall_time = (time.perf_counter_ns() - wall_start) / 1e9
+session.close()
+
+# Timing is captured above; all formatting/printing happens outside the timed region
+for i, r in enumerate(results, start=1):
+    if r["status"] is None:
         print(
-            f"   {'✅' if response.status_code==200 else ''} Status: {response.status_code} | Time: {duration} s"
-        )
-        results.append(
-            {
-                "prompt": prompt,
-                "status": response.status_code,
-                "time_s": duration,
-                "ok": response.ok,
-            }
+            f"   ❌ [{i}] {r['prompt']!r} | Error after {r['time_s']:.3f} s: {r['error']}"
         )
-    except Exception as e:
-        duration = round((time.time() - start) * 1000, 2)
-        print(f"   ❌ Error after {duration} s: {e}")
-        results.append(
-            {"prompt": prompt, "status": None, "time_s": duration, "error": str(e)}
+    else:
+        print(
+            f"   {'✅' if r['status']==200 else ''} [{i}] {r['prompt']!r} | Status: {r['status']} | Time: {r['time_s']:.3f} s"
         )
 
 # ==== SUMMARY ====
@@ -60,3 +83,4 @@ print("\n=== SUMMARY ===")
 avg_time = sum(r["time_s"] for r in results) / len(results)
 print(f"Total: {len(results)} requests")
 print(f"Average time: {avg_time:.2f} s")
+print(f"Wall time: {wall_time:.2f} s")
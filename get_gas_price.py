@@ -1,9 +1,22 @@
+import json
+import math
 import os
-from datetime import datetime
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 import dotenv
 import requests
 
+try:
+    import numpy as np
+
+    _HAS_NUMPY = True
+except ImportError:
+    _HAS_NUMPY = False
+
 dotenv.load_dotenv()
 
 ETHERSCAN_API_KEY = os.environ["ETHERSCAN_API_KEY"]
@@ -15,6 +28,25 @@ CHAIN_ID = "100"  # Gnosis
 # CHAIN_ID = "137"  # Polygon
 LIMIT = 500
 
+PRICE_CACHE_TTL_SECONDS = 5 * 60
+
+ETHERSCAN_PAGE_SIZE = 1000
+ETHERSCAN_MAX_RPS = 5  # Etherscan free-tier rate limit
+
+_rate_lock = threading.Lock()
+_next_request_at = 0.0
+
+
+def _throttle():
+    """Block until the next request slot under ETHERSCAN_MAX_RPS."""
+    global _next_request_at
+    with _rate_lock:
+        now = time.monotonic()
+        wait = _next_request_at - now
+        _next_request_at = max(now, _next_request_at) + 1 / ETHERSCAN_MAX_RPS
+    if wait > 0:
+        time.sleep(wait)
+
 
 def get_native_token_price_usd(chain_id):
     """Get the native token price in USD for the given chain."""
@@ -29,6 +61,14 @@ def get_native_token_price_usd(chain_id):
 
     token_id = token_map.get(chain_id, "ethereum")
 
+    # Reuse a recent price to spare CoinGecko's free-tier rate limit
+    cache_file = Path(tempfile.gettempdir()) / f"cg_{token_id}.json"
+    try:
+        if time.time() - cache_file.stat().st_mtime < PRICE_CACHE_TTL_SECONDS:
+            return json.loads(cache_file.read_text())["usd"]
+    except (OSError, json.JSONDecodeError, KeyError):
+        pass
+
     # Fetch token price in USD
     url = "https://api.coingecko.com/api/v3/simple/price"
     params = {"ids": token_id, "vs_currencies": "usd"}
@@ -36,10 +76,15 @@ def get_native_token_price_usd(chain_id):
     resp.raise_for_status()
     price_usd = resp.json()[token_id]["usd"]
 
+    try:
+        cache_file.write_text(json.dumps({"usd": price_usd}))
+    except OSError:
+        pass
+
     return price_usd
 
 
-def get_transactions(address, chain_id, limit=200):
+def _fetch_transactions_page(address, chain_id, page, page_size):
     url = "https://api.etherscan.io/v2/api"
     params = {
         "apikey": ETHERSCAN_API_KEY,
@@ -49,33 +94,59 @@ def get_transactions(address, chain_id, limit=200):
         "address": address,
         "startblock": 0,
         "endblock": 99999999,
-        "page": 1,
-        # "offset": limit,
+        "page": page,
+        "offset": page_size,
         "sort": "desc",
     }
+    _throttle()
     resp = requests.get(url, params=params)
     resp.raise_for_status()
     data = resp.json()
-    return data["result"]
+    result = data["result"]
+    if not isinstance(result, list):
+        raise RuntimeError(f"Etherscan error: {data.get('message')}: {result}")
+    return result
+
+
+def get_transactions(address, chain_id, limit=200, page_size=ETHERSCAN_PAGE_SIZE):
+    """Fetch the latest `limit` transactions, requesting pages concurrently."""
+    page_size = min(page_size, limit)
+    n_pages = math.ceil(limit / page_size)
+    with ThreadPoolExecutor(max_workers=ETHERSCAN_MAX_RPS) as executor:
+        pages = executor.map(
+            lambda page: _fetch_transactions_page(address, chain_id, page, page_size),
+            range(1, n_pages + 1),
+        )
+        txs = [tx for batch in pages for tx in batch]
+    return txs[:limit]
 
 
 if __name__ == "__main__":
     txs = get_transactions(ADDRESS, CHAIN_ID, LIMIT)
-    fees = []
-    for i, tx in enumerate(txs, start=1):
-
-        value_eth = int(tx["value"]) / 1e18
-        gas_price = int(tx["gasPrice"])
-        gas_used = int(tx["gasUsed"])
-        fee_eth = (gas_price * gas_used) / 1e18
-        timestamp = datetime.utcfromtimestamp(int(tx["timeStamp"]))
+
+    if _HAS_NUMPY:
+        # float64 rather than int64: gasPrice * gasUsed can exceed 2**63 wei
+        gas_prices = np.fromiter(
+            (int(tx["gasPrice"]) for tx in txs), dtype=np.float64, count=len(txs)
+        )
+        gas_used = np.fromiter(
+            (int(tx["gasUsed"]) for tx in txs), dtype=np.float64, count=len(txs)
+        )
+        fees = gas_prices * gas_used / 1e18
+    else:
+        fees = [int(tx["gasPrice"]) * int(tx["gasUsed"]) / 1e18 for tx in txs]
+
+    for i, (tx, fee_eth) in enumerate(zip(txs, fees), start=1):
+        timestamp = time.strftime(
+            "%Y-%m-%d %H:%M:%S UTC", time.gmtime(int(tx["timeStamp"]))
+        )
+        # value_eth = int(tx["value"]) / 1e18
         # print(
         #     f"{i}. {timestamp} | Hash: {tx['hash']} | From: {tx['from']} | To: {tx['to']} | Value: {value_eth:.6f} ETH | Fee: {fee_eth:.8f} ETH"
         # )
-        fees.append(fee_eth)
         print(f"{i}. Fee: {fee_eth:.8f} ETH at {timestamp} | Hash: {tx['hash']}")
 
-    average_fees = sum(fees) / len(fees)
+    average_fees = fees.mean() if _HAS_NUMPY else sum(fees) / len(fees)
     token_price_usd = get_native_token_price_usd(CHAIN_ID)
     average_fees_usd = average_fees * token_price_usd
 
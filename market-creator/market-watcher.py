@@ -1,16 +1,15 @@
 import json
 import os
+import time
 from collections import defaultdict
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 
 import dotenv
 from web3 import Web3
-from web3._utils.events import event_abi_to_log_topic
 
 dotenv.load_dotenv()
 
 RPC_URL = os.getenv("GNOSIS_RPC", "https://rpc.gnosischain.com")
-w3 = Web3(Web3.HTTPProvider(RPC_URL))
 
 # -------------------------------------------------------------------
 # CONFIG
@@ -42,179 +41,262 @@ FPMM_EVENT_ABI = [
         "type": "event",
     }
 ]
-REALITIO_EVENT_ABI = json.loads(open("./market-creator/realitio_abi.json").read())
+REALITIO_ABI_FILE = "./market-creator/realitio_abi.json"
 
 # -------------------------------------------------------------------
-# Event objects & topic0s
+# topic0s (keccak256 of the event signatures, precomputed)
 # -------------------------------------------------------------------
 
-factory_contract = w3.eth.contract(address=FACTORY, abi=FPMM_EVENT_ABI)
-fpmm_event = factory_contract.events.FixedProductMarketMakerCreation()
-fpmm_topic = event_abi_to_log_topic(fpmm_event._get_event_abi())
-
-realitio_contract = w3.eth.contract(address=REALITIO, abi=REALITIO_EVENT_ABI)
-realitio_event = realitio_contract.events.LogNewQuestion()
-realitio_topic = event_abi_to_log_topic(realitio_event._get_event_abi())
+# FixedProductMarketMakerCreation(address,address,address,address,bytes32[],uint256)
+FPMM_TOPIC = "0x92e0912d3d7f3192cad5c7ae3b47fb97f9c465c1dd12a5c24fd901ddb3905f43"
+# LogNewQuestion(bytes32,address,uint256,string,bytes32,address,uint32,uint32,uint256,uint256)
+REALITIO_TOPIC = "0xfe2dac156a3890636ce13f65f4fdf41dcaee11526e4a5374531572d92194796c"
 
 
 # -------------------------------------------------------------------
-# Convert timestamp → block using binary search
+# Convert timestamp → block: estimate from block time, then bracket + bisect
 # -------------------------------------------------------------------
 
+BLOCK_TIME_SECONDS = 5  # average Gnosis block time
+BLOCK_SEARCH_STEP = 64  # initial bracket width around the estimate
+
+
+def block_by_timestamp(w3, target_ts):
+    latest = w3.eth.get_block("latest")
+    ts_cache = {latest.number: latest.timestamp}
+
+    def ts_of(n):
+        if n not in ts_cache:
+            ts_cache[n] = w3.eth.get_block(n).timestamp
+        return ts_cache[n]
+
+    guess = latest.number - (latest.timestamp - target_ts) // BLOCK_TIME_SECONDS
+    guess = min(max(guess, 1), latest.number)
+
+    # Gallop away from the estimate until [low, high] brackets target_ts
+    step = BLOCK_SEARCH_STEP
+    if ts_of(guess) < target_ts:
+        low, high = guess, min(guess + step, latest.number)
+        while high < latest.number and ts_of(high) < target_ts:
+            step *= 2
+            low, high = high, min(high + step, latest.number)
+    else:
+        low, high = max(guess - step, 1), guess
+        while low > 1 and ts_of(low) >= target_ts:
+            step *= 2
+            low, high = max(low - step, 1), low
 
-def block_by_timestamp(target_ts):
-    low, high = 1, w3.eth.block_number
     while low < high:
         mid = (low + high) // 2
-        ts = w3.eth.get_block(mid).timestamp
-        if ts < target_ts:
+        if ts_of(mid) < target_ts:
             low = mid + 1
         else:
             high = mid
     return low
 
 
-now_ts = w3.eth.get_block("latest").timestamp
-start_ts = now_ts - DAYS * 86400
-
-FROM_BLOCK = block_by_timestamp(start_ts)
-TO_BLOCK = w3.eth.block_number
-
-print(f"Scanning last {DAYS} days → blocks {FROM_BLOCK} → {TO_BLOCK}")
-
-
 # -------------------------------------------------------------------
 # Batch eth_getLogs
 # -------------------------------------------------------------------
 
 
-def batch_get_logs(address, topic0, start, end, batch=20000):
+MAX_ADAPTIVE_BATCH = 100_000
+ADAPTIVE_GROW_AFTER = 3  # consecutive successes before doubling the batch
+RANGE_TOO_LARGE_ERRORS = (
+    "query returned more than",
+    "log response size exceeded",
+    "exceed maximum block range",
+    "block range is too large",
+    "range too large",
+)
+
+
+def batch_get_logs(w3, addresses, topic0s, start, end, batch=20000, topic1=None):
+    """
+    Fetch logs over [start, end], sizing each call AIMD-style: halve the batch
+    when the provider rejects a range as too large, double it after
+    ADAPTIVE_GROW_AFTER straight successes. Matches any of `topic0s` emitted
+    by any of `addresses` in a single eth_getLogs call per range; `topic1`
+    optionally pins the first indexed argument so the node filters on it.
+    """
     logs = []
     cur = start
+    successes = 0
     while cur <= end:
         stop = min(cur + batch - 1, end)
         print(f"  → fetching logs {cur} → {stop}")
-        params = {"fromBlock": cur, "toBlock": stop, "topics": [topic0]}
-        if address:
-            params["address"] = address
+        topics = [topic0s] if topic1 is None else [topic0s, topic1]
+        params = {"fromBlock": cur, "toBlock": stop, "topics": topics}
+        if addresses:
+            params["address"] = addresses
 
         try:
             logs.extend(w3.eth.get_logs(params))
         except Exception as e:
+            msg = str(e).lower()
+            if batch > 1 and any(m in msg for m in RANGE_TOO_LARGE_ERRORS):
+                batch //= 2
+                successes = 0
+                print(f"    ↘ range too large, shrinking batch to {batch}")
+                continue
             print("RPC error:", e)
+        else:
+            successes += 1
+            if successes >= ADAPTIVE_GROW_AFTER and batch < MAX_ADAPTIVE_BATCH:
+                batch = min(batch * 2, MAX_ADAPTIVE_BATCH)
+                successes = 0
 
         cur = stop + 1
     return logs
 
 
-# -------------------------------------------------------------------
-# 1) Fetch all Realitio questions in last N days
-# -------------------------------------------------------------------
-
-raw_q_logs = batch_get_logs(
-    address=[REALITIO],
-    topic0=realitio_topic,
-    start=FROM_BLOCK,
-    end=TO_BLOCK,
-)
-
-questions = [realitio_event.process_log(log) for log in raw_q_logs]
-
-# Map question_id → question text + timestamp
-question_map = {}
-for q in questions:
-    qid_hex = q["args"]["question_id"].hex()
-    question_map[qid_hex] = {
-        "question": q["args"]["question"],
-        "created": q["args"]["created"],
-    }
-
-
-print(f"\n🟩 Found {len(question_map)} questions")
-
-
-# -------------------------------------------------------------------
-# 2) Fetch all markets from factory in last N days
-# -------------------------------------------------------------------
-
-raw_m_logs = batch_get_logs(
-    address=[FACTORY],
-    topic0=fpmm_topic,
-    start=FROM_BLOCK,
-    end=TO_BLOCK,
-)
-
-markets = [fpmm_event.process_log(log) for log in raw_m_logs]
-print(f"🟦 Found {len(markets)} markets\n")
-
-
 # -------------------------------------------------------------------
 # Helper: Convert timestamp → IST
 # -------------------------------------------------------------------
 
-IST = timezone(timedelta(hours=5, minutes=30))
-UTC = timezone.utc
+IST_OFFSET_SECONDS = 5 * 3600 + 30 * 60
 
 
 def to_ist(ts):
-    return datetime.fromtimestamp(ts, IST).strftime("%Y-%m-%d %H:%M:%S IST")
+    return time.strftime("%Y-%m-%d %H:%M:%S IST", time.gmtime(ts + IST_OFFSET_SECONDS))
 
 
 def to_utc(ts):
-    return datetime.fromtimestamp(ts, UTC).strftime("%Y-%m-%d %H:%M:%S UTC")
-
-
-# -------------------------------------------------------------------
-# Print results with mapping
-# -------------------------------------------------------------------
-
-print("==============================================")
-print("      MARKETS (mapped to questions)")
-print("==============================================\n")
-
-no_of_markets = 0
-markets_per_day = defaultdict(int)
-
-for m in markets:
-    args = m["args"]
-    market_addr = args["fixedProductMarketMaker"]
-    creator = args["creator"]
-    if creator.lower() != CREATOR_TO_TRACK.lower():
-        continue
-    condition_ids = args["conditionIds"]
-
-    # For deterministic markets, 1 conditionId → 1 questionId
-    question_id = condition_ids[0]
-    question_id_hex = question_id.hex()
-    q = question_map.get(question_id_hex)
-    question_text = q["question"] if q else "(No question found)"
-
-    # created_ts = q["created_utc"] if q else None
-    # created_ist = to_ist(created_ts) if created_ts else "N/A"
-
-    tx_hash = m["transactionHash"]
-    receipt = w3.eth.get_transaction_receipt(tx_hash)
-    block = w3.eth.get_block(receipt["blockNumber"])
-    created_ts = block.timestamp
-    # created_ist = to_ist(created_ts)
-    # created_utc = to_utc(created_ts)
-    date = to_utc(created_ts).split(" ")[0]
-
-    print("----------------------------------------------")
-    print(f"Market:     {market_addr}")
-    print(f"Creator:    {creator}")
-    print(f"Question:   {question_text}")
-    # print(f"Timestamp:  {created_ist}\t|\t{created_utc}")
-    print(f"Date:       {date}")
-    print()
-
-    no_of_markets += 1
-    markets_per_day[date] += 1
-
-print(f"Total markets by {CREATOR_TO_TRACK}: {no_of_markets}")
-
-print("\n==============================================")
-print(" Markets created per day")
-print("==============================================")
-for day, count in sorted(markets_per_day.items()):
-    print(f"{day}: {count}")
+    return time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime(ts))
+
+
+def main():
+    w3 = Web3(Web3.HTTPProvider(RPC_URL))
+
+    realitio_abi = json.loads(open(REALITIO_ABI_FILE).read())
+    fpmm_event = w3.eth.contract(
+        address=FACTORY, abi=FPMM_EVENT_ABI
+    ).events.FixedProductMarketMakerCreation()
+    realitio_event = w3.eth.contract(
+        address=REALITIO, abi=realitio_abi
+    ).events.LogNewQuestion()
+
+    latest = w3.eth.get_block("latest")
+    start_ts = latest.timestamp - DAYS * 86400
+
+    from_block = block_by_timestamp(w3, start_ts)
+    to_block = latest.number
+
+    print(f"Scanning last {DAYS} days → blocks {from_block} → {to_block}")
+
+    # -------------------------------------------------------------------
+    # Fetch Realitio questions + the tracked creator's markets concurrently.
+    # `creator` is FPMM's indexed topic1, so the node filters markets for us;
+    # that can't share a filter with LogNewQuestion, whose topic1 is the
+    # question id, hence two scans side by side rather than one fused scan.
+    # -------------------------------------------------------------------
+
+    creator_topic = "0x" + CREATOR_TO_TRACK.lower().removeprefix("0x").rjust(64, "0")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        q_future = executor.submit(
+            batch_get_logs,
+            w3,
+            addresses=[REALITIO],
+            topic0s=[REALITIO_TOPIC],
+            start=from_block,
+            end=to_block,
+        )
+        m_future = executor.submit(
+            batch_get_logs,
+            w3,
+            addresses=[FACTORY],
+            topic0s=[FPMM_TOPIC],
+            start=from_block,
+            end=to_block,
+            topic1=creator_topic,
+        )
+        raw_q_logs = q_future.result()
+        raw_m_logs = m_future.result()
+
+    # -------------------------------------------------------------------
+    # 1) Realitio questions in last N days
+    # -------------------------------------------------------------------
+
+    questions = [realitio_event.process_log(log) for log in raw_q_logs]
+
+    # Map question_id → question text + timestamp
+    question_map = {}
+    for q in questions:
+        qid_hex = q["args"]["question_id"].hex()
+        question_map[qid_hex] = {
+            "question": q["args"]["question"],
+            "created": q["args"]["created"],
+        }
+
+    print(f"\n🟩 Found {len(question_map)} questions")
+
+    # -------------------------------------------------------------------
+    # 2) Markets from factory in last N days
+    # -------------------------------------------------------------------
+
+    markets = [fpmm_event.process_log(log) for log in raw_m_logs]
+    print(f"🟦 Found {len(markets)} markets by {CREATOR_TO_TRACK}\n")
+
+    # -------------------------------------------------------------------
+    # Print results with mapping
+    # -------------------------------------------------------------------
+
+    print("==============================================")
+    print("      MARKETS (mapped to questions)")
+    print("==============================================\n")
+
+    no_of_markets = 0
+    markets_per_day = defaultdict(int)
+
+    # The factory log already carries its block number, so only the block
+    # timestamps are needed — fetched once per unique block in a single batch
+    block_numbers = sorted({m["blockNumber"] for m in markets})
+    block_ts = {}
+    if block_numbers:
+        with w3.batch_requests() as batch:
+            for n in block_numbers:
+                batch.add(w3.eth.get_block(n))
+            block_ts = {n: b.timestamp for n, b in zip(block_numbers, batch.execute())}
+
+    for m in markets:
+        args = m["args"]
+        market_addr = args["fixedProductMarketMaker"]
+        creator = args["creator"]
+        condition_ids = args["conditionIds"]
+
+        # For deterministic markets, 1 conditionId → 1 questionId
+        question_id = condition_ids[0]
+        question_id_hex = question_id.hex()
+        q = question_map.get(question_id_hex)
+        question_text = q["question"] if q else "(No question found)"
+
+        # created_ts = q["created_utc"] if q else None
+        # created_ist = to_ist(created_ts) if created_ts else "N/A"
+
+        created_ts = block_ts[m["blockNumber"]]
+        # created_ist = to_ist(created_ts)
+        # created_utc = to_utc(created_ts)
+        date = to_utc(created_ts).split(" ")[0]
+
+        print("----------------------------------------------")
+        print(f"Market:     {market_addr}")
+        print(f"Creator:    {creator}")
+        print(f"Question:   {question_text}")
+        # print(f"Timestamp:  {created_ist}\t|\t{created_utc}")
+        print(f"Date:       {date}")
+        print()
+
+        no_of_markets += 1
+        markets_per_day[date] += 1
+
+    print(f"Total markets by {CREATOR_TO_TRACK}: {no_of_markets}")
+
+    print("\n==============================================")
+    print(" Markets created per day")
+    print("==============================================")
+    for day, count in sorted(markets_per_day.items()):
+        print(f"{day}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,17 @@
 import os
-from collections import defaultdict
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import lru_cache
+from pathlib import Path
 
 import requests
 from dotenv import load_dotenv
 from eth_abi import decode
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from web3 import Web3
 
 # -------------------------------
@@ -18,21 +24,85 @@ if not GNOSIS_RPC:
     raise ValueError("Please set the GNOSIS_RPC environment variable.")
 
 EVENT_SIGNATURE = "Request(address,bytes32,bytes)"
-EVENT_TOPIC = Web3.keccak(text=EVENT_SIGNATURE).to_0x_hex()
+# keccak256(EVENT_SIGNATURE), precomputed
+EVENT_TOPIC = "0x1ebd17f97038d3a14148566de635eab9901371bf904262f5498331b0c62921ce"
 
 # Average block time on Gnosis (≈5s)
 BLOCK_TIME_SECONDS = 5
 MAX_BLOCK_SPAN = 5000  # Max per getLogs call
 
 LOG_FILE = "request_events.log"
+PROGRESS_EVERY = 10  # print span progress every N completed getLogs calls
+
+# eth_getLogs errors meaning "ask for fewer blocks" (provider caps differ)
+RANGE_TOO_LARGE_ERRORS = (
+    "query returned more than",
+    "log response size exceeded",
+    "exceed maximum block range",
+    "block range is too large",
+    "range too large",
+)
+
+# Persistent request_data_hex → tool cache, shared across runs
+_IPFS_CACHE_DB = Path(__file__).parent / ".ipfs_tool_cache.sqlite"
+_ipfs_cache_lock = threading.Lock()
+_ipfs_cache_conn = None
+
+# Shared keep-alive pool for the IPFS gateway (thread-safe for plain GETs)
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=50,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.3),
+)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+# IPFS lookups are pure network waits, so the pool can run far wider than
+# the CPU count
+IPFS_MAX_WORKERS = 64
+
+GET_LOGS_MAX_RETRIES = 4
+GET_LOGS_RETRY_BACKOFF_BASE = 3
 
 # -------------------------------
 # HELPER FUNCTIONS
 # -------------------------------
 
 
+def _get_ipfs_cache() -> sqlite3.Connection:
+    """Open (once) the on-disk IPFS tool cache. Callers must hold _ipfs_cache_lock."""
+    global _ipfs_cache_conn
+    if _ipfs_cache_conn is None:
+        _ipfs_cache_conn = sqlite3.connect(_IPFS_CACHE_DB, check_same_thread=False)
+        _ipfs_cache_conn.execute(
+            "CREATE TABLE IF NOT EXISTS tools (hash TEXT PRIMARY KEY, tool TEXT)"
+        )
+    return _ipfs_cache_conn
+
+
+def _load_cached_tool(request_data_hex: str):
+    with _ipfs_cache_lock:
+        row = (
+            _get_ipfs_cache()
+            .execute("SELECT tool FROM tools WHERE hash = ?", (request_data_hex,))
+            .fetchone()
+        )
+    return row[0] if row else None
+
+
+def _save_cached_tool(request_data_hex: str, tool: str):
+    with _ipfs_cache_lock:
+        conn = _get_ipfs_cache()
+        conn.execute(
+            "INSERT OR IGNORE INTO tools (hash, tool) VALUES (?, ?)",
+            (request_data_hex, tool),
+        )
+        conn.commit()
+
+
 def ipfs_request(ipfs_link: str):
-    response = requests.get(ipfs_link, timeout=10)
+    response = _SESSION.get(ipfs_link, timeout=10)
     response.raise_for_status()  # raise if status code is not 200
     data = response.json()
     return data.get("tool")
@@ -40,6 +110,10 @@ def ipfs_request(ipfs_link: str):
 
 @lru_cache(maxsize=None)
 def fetch_tool_from_ipfs(request_data_hex: str, tx_hash: str = None):
+    cached = _load_cached_tool(request_data_hex)
+    if cached is not None:
+        return cached
+
     base_ipfs_link = f"http://gateway.autonolas.tech/ipfs/f01701220{request_data_hex}"
     urls_to_try = [f"{base_ipfs_link}/metadata.json", base_ipfs_link]
 
@@ -51,6 +125,7 @@ def fetch_tool_from_ipfs(request_data_hex: str, tx_hash: str = None):
                     print(
                         f"⚠️  Found 'claude' in tool name from IPFS: {base_ipfs_link} (tx {tx_hash})"
                     )
+                _save_cached_tool(request_data_hex, tool)
                 return tool
         except Exception:
             continue  # silently try next URL
@@ -59,7 +134,60 @@ def fetch_tool_from_ipfs(request_data_hex: str, tx_hash: str = None):
     return None
 
 
-def get_all_tool_ids(days=7, contract_address=None, from_block=None, max_workers=20):
+def get_logs_with_retry(w3, params):
+    """eth_getLogs with exponential backoff, for providers that rate-limit bursts."""
+    for attempt in range(1, GET_LOGS_MAX_RETRIES + 1):
+        try:
+            return w3.eth.get_logs(params)
+        except Exception as e:
+            # Oversized ranges won't succeed on retry; let the caller shrink them
+            if attempt == GET_LOGS_MAX_RETRIES or _is_range_too_large(e):
+                raise
+            wait = GET_LOGS_RETRY_BACKOFF_BASE * (2 ** (attempt - 1))
+            print(
+                f"    [retry {attempt}/{GET_LOGS_MAX_RETRIES - 1}] getLogs {params['fromBlock']} → {params['toBlock']} failed, retrying in {wait}s: {e}"
+            )
+            time.sleep(wait)
+
+
+def _is_range_too_large(exc) -> bool:
+    msg = str(exc).lower()
+    return any(marker in msg for marker in RANGE_TOO_LARGE_ERRORS)
+
+
+def fetch_span_logs(w3, params):
+    """
+    eth_getLogs over params' fromBlock → toBlock, split into halves whenever
+    the provider rejects a range as too large. Spans are fetched in parallel
+    MAX_BLOCK_SPAN windows, so they only ever need to shrink.
+    """
+    start, last = params["fromBlock"], params["toBlock"]
+    span = last - start + 1
+    all_logs = []
+    while start <= last:
+        end = min(start + span - 1, last)
+        try:
+            logs = get_logs_with_retry(
+                w3, {**params, "fromBlock": start, "toBlock": end}
+            )
+        except Exception as e:
+            if span == 1 or not _is_range_too_large(e):
+                raise
+            span //= 2
+            print(f"    ↘ {start} → {end} too large, shrinking span to {span}")
+            continue
+        all_logs.extend(logs)
+        start = end + 1
+    return all_logs
+
+
+def get_all_tool_ids(
+    days=7,
+    contract_address=None,
+    from_block=None,
+    max_workers=IPFS_MAX_WORKERS,
+    log_workers=16,
+):
     if contract_address is None:
         raise ValueError("Please provide a contract address.")
 
@@ -79,37 +207,56 @@ def get_all_tool_ids(days=7, contract_address=None, from_block=None, max_workers
 
     all_tools_requested_for = defaultdict(int)
 
-    for start in range(from_block, latest_block, MAX_BLOCK_SPAN):
-        end = min(start + MAX_BLOCK_SPAN - 1, latest_block)
-        print(f"📦 Checking blocks {start} → {end} ...", end="\r")
-
-        logs = w3.eth.get_logs(
-            {
-                "fromBlock": start,
-                "toBlock": end,
-                "address": contract_address,
-                "topics": [EVENT_TOPIC],
-            }
-        )
+    spans = [
+        (start, min(start + MAX_BLOCK_SPAN - 1, latest_block))
+        for start in range(from_block, latest_block, MAX_BLOCK_SPAN)
+    ]
 
-        if not logs:
-            continue
+    # Fetch all block spans concurrently and feed each batch of logs into the
+    # IPFS pool as soon as it arrives
+    with (
+        ThreadPoolExecutor(max_workers=log_workers) as log_executor,
+        ThreadPoolExecutor(max_workers=max_workers) as ipfs_executor,
+    ):
+        log_futures = {
+            log_executor.submit(
+                fetch_span_logs,
+                w3,
+                {
+                    "fromBlock": start,
+                    "toBlock": end,
+                    "address": contract_address,
+                    "topics": [EVENT_TOPIC],
+                },
+            ): (start, end)
+            for start, end in spans
+        }
 
-        # Fetch IPFS in parallel
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {
-                executor.submit(
-                    fetch_tool_from_ipfs,
-                    decode(["bytes32", "bytes"], log["data"])[1].hex(),
-                    log["transactionHash"].hex(),
-                ): log
-                for log in logs
-            }
-
-            for future in as_completed(futures):
-                tool = future.result()
-                if tool:
-                    all_tools_requested_for[tool] += 1
+        # Many Request events share the same request_data, so fetch each
+        # unique hash once and credit the tool with its occurrence count
+        hash_counts = Counter()
+        ipfs_futures = {}
+        for done, future in enumerate(as_completed(log_futures), start=1):
+            if done % PROGRESS_EVERY == 0 or done == len(spans):
+                start, end = log_futures[future]
+                print(
+                    f"📦 Fetched blocks {start} → {end} ({done}/{len(spans)}) ...",
+                    end="\r",
+                )
+            for log in future.result():
+                request_data_hex = decode(["bytes32", "bytes"], log["data"])[1].hex()
+                hash_counts[request_data_hex] += 1
+                if request_data_hex not in ipfs_futures:
+                    ipfs_futures[request_data_hex] = ipfs_executor.submit(
+                        fetch_tool_from_ipfs,
+                        request_data_hex,
+                        log["transactionHash"].hex(),
+                    )
+
+        for request_data_hex, future in ipfs_futures.items():
+            tool = future.result()
+            if tool:
+                all_tools_requested_for[tool] += hash_counts[request_data_hex]
 
     return all_tools_requested_for
 
@@ -125,7 +272,7 @@ if __name__ == "__main__":
     contract_address = "0xdb78159e9246EC738F51c2c9cb1169b5C0e45fee"
     days = 3
     requested_tools = get_all_tool_ids(
-        days, contract_address, from_block=None, max_workers=20
+        days, contract_address, from_block=None, max_workers=IPFS_MAX_WORKERS
     )
 
     total_calls = sum(requested_tools.values())
@@ -1,6 +1,8 @@
 import os
+from contextlib import nullcontext
 
 from dotenv import load_dotenv
+from eth_abi import decode
 from web3 import Web3
 
 # -------------------------------
@@ -13,14 +15,26 @@ GNOSIS_RPC = os.getenv("GNOSIS_RPC")
 
 # Deliver(address mech, address mechServiceMultisig, bytes32 requestId, uint256 deliveryRate, bytes data)
 EVENT_SIGNATURE = "Deliver(address,address,bytes32,uint256,bytes)"
-EVENT_TOPIC = Web3.keccak(text=EVENT_SIGNATURE).hex()
+# keccak256(EVENT_SIGNATURE), precomputed
+EVENT_TOPIC = "0xb0d013658abb05dd269ff3ab257175d5ae3fa4107d4e142abd96e947cd5cb06f"
 
 
 # Average block time on Gnosis (≈5s)
 BLOCK_TIME_SECONDS = 5
-MAX_BLOCK_SPAN = 20_000  # Gnosis RPC max per getLogs call
+MAX_BLOCK_SPAN = 20_000  # Initial span per getLogs call
+
+MAX_ADAPTIVE_SPAN = 100_000  # sparse ranges grow the span up to this
+ADAPTIVE_GROW_AFTER = 3  # consecutive successes before doubling the span
+RANGE_TOO_LARGE_ERRORS = (
+    "query returned more than",
+    "log response size exceeded",
+    "exceed maximum block range",
+    "block range is too large",
+    "range too large",
+)
 
 LOG_FILE = "deliver_events.log"
+LOG_FILE_BUFFER_BYTES = 1 << 16  # coalesce per-log writes into 64 KiB flushes
 
 
 def normalize_request_id(value) -> bytes:
@@ -46,9 +60,60 @@ def normalize_request_id(value) -> bytes:
     raise TypeError("Unsupported requestId type")
 
 
-def find_tx_by_request_id(request_id_to_find: int, days=7, contract_address=None):
+def decode_deliver_data(data):
+    """
+    Decode Deliver's non-indexed (bytes32 requestId, uint256 deliveryRate,
+    bytes data) by slicing the fixed ABI layout directly. Falls back to
+    eth_abi.decode if the payload doesn't fit that layout.
+    """
+    data = bytes(data)
+    if len(data) >= 128:
+        offset = int.from_bytes(data[64:96], "big")
+        start = offset + 32
+        if start <= len(data):
+            end = start + int.from_bytes(data[offset:start], "big")
+            if end <= len(data):
+                return data[:32], int.from_bytes(data[32:64], "big"), data[start:end]
+    return decode(["bytes32", "uint256", "bytes"], data)
+
+
+def get_logs_adaptive(w3, params, span=MAX_BLOCK_SPAN):
+    """Yield (start, end, logs) over params' block range, resizing the span AIMD-style."""
+    start, last = params["fromBlock"], params["toBlock"]
+    successes = 0
+    while start <= last:
+        end = min(start + span - 1, last)
+        try:
+            logs = w3.eth.get_logs({**params, "fromBlock": start, "toBlock": end})
+        except Exception as e:
+            if span == 1 or not any(
+                m in str(e).lower() for m in RANGE_TOO_LARGE_ERRORS
+            ):
+                raise
+            span, successes = span // 2, 0
+            continue
+        yield start, end, logs
+        start, successes = end + 1, successes + 1
+        if successes >= ADAPTIVE_GROW_AFTER:
+            span, successes = min(span * 2, MAX_ADAPTIVE_SPAN), 0
+
+
+def find_tx_by_request_id(
+    request_id_to_find: int,
+    days=7,
+    contract_address=None,
+    emit_log_file=True,
+    verbose=False,
+):
+    """
+    Scan Deliver events for request_id_to_find, returning on the first match.
+    With emit_log_file=True every scanned Deliver is also dumped to LOG_FILE,
+    and with verbose=True each one is echoed to stdout; with both off,
+    non-matching logs cost a single 32-byte compare.
+    """
     if contract_address is None:
         raise ValueError("Please provide a contract address.")
+    target = normalize_request_id(request_id_to_find)
     contract_address = Web3.to_checksum_address(contract_address)
     w3 = Web3(Web3.HTTPProvider(GNOSIS_RPC))
     if not w3.is_connected():
@@ -62,48 +127,42 @@ def find_tx_by_request_id(request_id_to_find: int, days=7, contract_address=None
     print(f"🔎 Searching Deliver events for requestId={request_id_to_find}")
     print(f"⏱  From block {from_block} → {latest_block} (≈ last {days} days)\n")
 
-    # Search in chunks of 20k blocks
-    for start in range(from_block, latest_block, MAX_BLOCK_SPAN):
-        end = min(start + MAX_BLOCK_SPAN - 1, latest_block)
-        print(f"📦 Checking blocks {start} → {end} ...", end="\r")
-
-        logs = w3.eth.get_logs(
+    # Search in adaptively sized chunks (starting at MAX_BLOCK_SPAN blocks)
+    log_cm = (
+        open(LOG_FILE, "a", buffering=LOG_FILE_BUFFER_BYTES)
+        if emit_log_file
+        else nullcontext()
+    )
+    with log_cm as log_fh:
+        for start, end, logs in get_logs_adaptive(
+            w3,
             {
-                "fromBlock": start,
-                "toBlock": end,
+                "fromBlock": from_block,
+                "toBlock": latest_block,
                 "address": contract_address,
                 "topics": [EVENT_TOPIC],
-            }
-        )
-
-        for log in logs:
-            data_bytes = bytes(log["data"])
-
-            request_id = data_bytes[:32].hex()
-
-            request_data = data_bytes[64:].hex()  # raw bytes data as hex
-            with open(LOG_FILE, "a") as f:
-                f.write(
-                    f"{request_id} : http://gateway.autonolas.tech/ipfs/f01701220{request_data.replace('00000000000000000000000000000000000000000000000000000000000000600000000000000000000000000000000000000000000000000000000000000020', '')}/{int(request_id, 16)}\n"
-                )
-
-            request_id_to_check = int(request_id, 16)
-            request_id_to_find = normalize_request_id(request_id_to_find)
-
-            print(
-                f"Checking {request_id_to_check=} {request_id=} against {request_id_to_find=}"
-            )
-
-            data_bytes = bytes(log["data"])
-            request_id_bytes = data_bytes[:32]
-
-            if request_id_bytes == request_id_to_find:
-                print("\n✅ Found matching Deliver log:")
-                print(f"Tx hash: 0x{log['transactionHash'].hex()}")
-                print(f"Block: {log['blockNumber']}")
-                print(f"requestId: 0x{request_id}")
-                # print(f"log data: {log['data']}")
-                return
+            },
+        ):
+            print(f"📦 Checked blocks {start} → {end} ...", end="\r")
+
+            for log in logs:
+                if log_fh is not None or verbose:
+                    request_id_bytes, _, request_data = decode_deliver_data(log["data"])
+                    request_id = request_id_bytes.hex()
+                    if log_fh is not None:
+                        log_fh.write(
+                            f"{request_id} : http://gateway.autonolas.tech/ipfs/f01701220{request_data.hex()}/{int(request_id, 16)}\n"
+                        )
+                    if verbose:
+                        print(f"Checking {request_id=} against {target.hex()=}")
+
+                if bytes(log["data"][:32]) == target:
+                    print("\n✅ Found matching Deliver log:")
+                    print(f"Tx hash: 0x{log['transactionHash'].hex()}")
+                    print(f"Block: {log['blockNumber']}")
+                    print(f"requestId: 0x{target.hex()}")
+                    # print(f"log data: {log['data']}")
+                    return
 
     print("\n❌ No Deliver event found for that requestId in the last week.")
 
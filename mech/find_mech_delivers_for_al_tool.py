@@ -4,6 +4,8 @@ from datetime import datetime, timezone
 import requests
 from dotenv import load_dotenv
 from eth_abi import decode
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from web3 import Web3
 
 # -------------------------------
@@ -16,16 +18,58 @@ GNOSIS_RPC = os.getenv("GNOSIS_RPC")
 
 # Deliver(address mech, address mechServiceMultisig, bytes32 requestId, uint256 deliveryRate, bytes data)
 EVENT_SIGNATURE = "Deliver(address,address,bytes32,uint256,bytes)"
-EVENT_TOPIC = Web3.keccak(text=EVENT_SIGNATURE).hex()
+# keccak256(EVENT_SIGNATURE), precomputed
+EVENT_TOPIC = "0xb0d013658abb05dd269ff3ab257175d5ae3fa4107d4e142abd96e947cd5cb06f"
 
 
 # Average block time on Gnosis (≈5s)
 BLOCK_TIME_SECONDS = 5
-MAX_BLOCK_SPAN = 20_000  # Gnosis RPC max per getLogs call
+MAX_BLOCK_SPAN = 20_000  # Initial span per getLogs call
+
+# Shared keep-alive pool for the IPFS gateway (thread-safe for plain GETs)
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=50,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.3),
+)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+MAX_ADAPTIVE_SPAN = 100_000  # sparse ranges grow the span up to this
+ADAPTIVE_GROW_AFTER = 3  # consecutive successes before doubling the span
+RANGE_TOO_LARGE_ERRORS = (
+    "query returned more than",
+    "log response size exceeded",
+    "exceed maximum block range",
+    "block range is too large",
+    "range too large",
+)
 
 LOG_FILE = "request_events.log"
 
 
+def get_logs_adaptive(w3, params, span=MAX_BLOCK_SPAN):
+    """Yield (start, end, logs) over params' block range, resizing the span AIMD-style."""
+    start, last = params["fromBlock"], params["toBlock"]
+    successes = 0
+    while start <= last:
+        end = min(start + span - 1, last)
+        try:
+            logs = w3.eth.get_logs({**params, "fromBlock": start, "toBlock": end})
+        except Exception as e:
+            if span == 1 or not any(
+                m in str(e).lower() for m in RANGE_TOO_LARGE_ERRORS
+            ):
+                raise
+            span, successes = span // 2, 0
+            continue
+        yield start, end, logs
+        start, successes = end + 1, successes + 1
+        if successes >= ADAPTIVE_GROW_AFTER:
+            span, successes = min(span * 2, MAX_ADAPTIVE_SPAN), 0
+
+
 def find_tx_by_request_id(
     days=7, contract_address=None, from_block=None, tool_to_find=None
 ):
@@ -45,25 +89,23 @@ def find_tx_by_request_id(
     print(f"🔎 Searching Requests events")
     print(f"⏱  From block {from_block} → {latest_block} (≈ last {days} days)\n")
 
-    # Search in chunks of 20k blocks
-    for start in range(from_block, latest_block, MAX_BLOCK_SPAN):
-        end = min(start + MAX_BLOCK_SPAN - 1, latest_block)
-        print(f"📦 Checking blocks {start} → {end} ...", end="\r")
-
-        logs = w3.eth.get_logs(
-            {
-                "fromBlock": start,
-                "toBlock": end,
-                "address": contract_address,
-                "topics": [EVENT_TOPIC],
-            }
-        )
+    # Search in adaptively sized chunks (starting at MAX_BLOCK_SPAN blocks)
+    for start, end, logs in get_logs_adaptive(
+        w3,
+        {
+            "fromBlock": from_block,
+            "toBlock": latest_block,
+            "address": contract_address,
+            "topics": [EVENT_TOPIC],
+        },
+    ):
+        print(f"📦 Checked blocks {start} → {end} ...", end="\r")
 
         for log in logs:
             decoded = decode(["bytes32", "uint256", "bytes"], log["data"])
             request_id, delivery_rate, request_data = decoded
             ipfs_link = f"http://gateway.autonolas.tech/ipfs/f01701220{request_data.hex()}/{int(request_id.hex(), 16)}"
-            result = requests.get(ipfs_link)
+            result = _SESSION.get(ipfs_link)
             try:
                 result_json = result.json()
             except Exception as e:
@@ -16,7 +16,8 @@ GNOSIS_RPC = os.getenv("GNOSIS_RPC")
 
 # Deliver(address mech, address mechServiceMultisig, bytes32 requestId, uint256 deliveryRate, bytes data)
 EVENT_SIGNATURE = "Request(address,bytes32,bytes)"
-EVENT_TOPIC = Web3.keccak(text=EVENT_SIGNATURE).hex()
+# keccak256(EVENT_SIGNATURE), precomputed
+EVENT_TOPIC = "0x1ebd17f97038d3a14148566de635eab9901371bf904262f5498331b0c62921ce"
 
 
 # Average block time on Gnosis (≈5s)
@@ -21,14 +21,19 @@
 
 import contextlib
 import json
+import multiprocessing
 import os
-import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from io import StringIO
 from timeit import default_timer as timer
+from typing import Iterator, TextIO
 
 from dotenv import load_dotenv  # type: ignore
 from metrit import metrit
+from metrit.Monitoring import Monitoring
+from metrit.Stats import Stats
+from metrit.utils import format_size
 from packages.jhehemann.customs.prediction_sum_url_content.prediction_sum_url_content import (
     run as prediction_sum_url_content_run,
 )
@@ -100,7 +105,7 @@ MARKETS = [
     """Will the FBI publicly announce, before or on August 31, 2025, the implementation of new technology or protocols aimed at more effectively tracking or identifying perpetrators of swatting incidents?""",
     """Will Evergrande's liquidators publicly announce, before or on August 30, 2025, the sale of at least $500 million in assets as part of the company's ongoing liquidation process?""",
     """Will at least one additional professional tennis player ranked outside the WTA or ATP top 100 publicly announce joining OnlyFans before or on August 30, 2025?""",
-    """Will the California Department of Public Health publicly report that Monterey County has surpassed 358 confirmed cases of valley fever in 2024 by or before September 24, 2025?"""
+    """Will the California Department of Public Health publicly report that Monterey County has surpassed 358 confirmed cases of valley fever in 2024 by or before September 24, 2025?""",
     """Will Google publicly release, before or on August 31, 2025, an updated environmental impact report for Gemini AI that includes both direct and indirect water usage figures?""",
     "Will the total market capitalization of all cryptocurrencies, as reported by CoinMarketCap, fall below $1.5 trillion at any point on or before October 17, 2025?",
     "Will any new public building project in the United States be publicly announced as aiming for Living Building Challenge certification on or before October 14, 2025?",
@@ -118,6 +123,10 @@ MARKETS = [
     "Will any U.S. federal government agency publicly announce, on or before October 17, 2025, the initiation of a new deportation program or the resumption of large-scale deportations of immigrants living in the United States illegally who have not committed additional crimes?",
     "Will any new public building project in the United States be publicly announced as aiming for Living Building Challenge certification on or before October 14, 2025?",
 ]
+# Drop repeated markets (order-preserving) so no combination is run twice
+MARKETS = list(dict.fromkeys(MARKETS))
+# Catches a missing comma silently gluing two adjacent market strings together
+assert all(len(market) < 500 for market in MARKETS), "Suspiciously long market"
 PROMPTS = [
     f"""With the given question {market!r} and the `yes` option represented by `Yes` and the `no` option represented by `No`, what are the respective probabilities of `p_yes` and `p_no` occurring?"""
     for market in MARKETS
@@ -125,15 +134,68 @@ PROMPTS = [
 
 
 CURRENT_TIME_PREFIX = datetime.now().strftime("%Y%m%d_%H%M%S")
-REGEX_TO_EXTRACT_RESOURCE_STATS = (
-    # r"\d+\.\d+MB avg of memory\s+\d+\.\d+% avg of CPU\s+\d+B IO reads\s+\d+B IO writes"
-    r"\d.*?avg of memory.*writes"
-)
 
 API_KEYS = json.loads(os.getenv("API_KEYS", "{}"))
 
 JSON_KEYS = {"p_yes", "p_no", "confidence", "info_utility"}
 TEST_RESULTS_DIR = "./tools_test_results"
+MAX_WORKERS = 8  # concurrent tool runs; bounded by upstream LLM API rate limits
+
+
+# Stats fields read by format_resource_utilization
+METRIT_STATS_FIELDS = (
+    "rss_bytes_avg",
+    "cpu_percentage_avg",
+    "read_bytes",
+    "write_bytes",
+)
+
+
+def check_metrit_api() -> None:
+    """Fail loudly if metrit no longer has what capture_metrit_stats relies on."""
+    missing = [
+        f"Monitoring.{name}"
+        for name in ("print", "get_data")
+        if not callable(getattr(Monitoring, name, None))
+    ]
+    missing += [
+        f"Stats.{name}" for name in METRIT_STATS_FIELDS if not hasattr(Stats, name)
+    ]
+    if missing:
+        raise RuntimeError(
+            f"Installed metrit lacks {', '.join(missing)}; update capture_metrit_stats"
+        )
+
+
+@contextlib.contextmanager
+def capture_metrit_stats() -> Iterator[list]:
+    """
+    metrit has no return-value API and only print()s its summary, so while
+    active, Monitoring.print is swapped for a hook that appends the Stats
+    object to the yielded list instead of printing it.
+    """
+    check_metrit_api()
+    captured: list = []
+    original_print = Monitoring.print
+
+    def keep_stats(self: Monitoring, *args, **kwargs) -> None:
+        captured.append(self.get_data())
+
+    Monitoring.print = keep_stats
+    try:
+        yield captured
+    finally:
+        Monitoring.print = original_print
+
+
+def format_resource_utilization(stats: Stats) -> str:
+    """Format metrit stats the way its one-line summary does."""
+    return (
+        f"{format_size(stats.rss_bytes_avg)} avg of memory "
+        f"{stats.cpu_percentage_avg:.2f}% avg of CPU "
+        f"{format_size(stats.read_bytes)} IO reads "
+        f"{format_size(stats.write_bytes)} IO writes"
+    )
 
 
 def check_keys(json_obj: dict) -> bool:
@@ -221,7 +283,17 @@ def get_current_agent_hash() -> str:
     return packages["dev"]["agent/valory/mech/0.1.0"]
 
 
+def get_results_filepath() -> str:
+    """Create the results dir and return this run's JSONL path."""
+    os.makedirs(TEST_RESULTS_DIR, exist_ok=True)
+    current_agent_hash = get_current_agent_hash()
+    return os.path.join(
+        TEST_RESULTS_DIR, f"{CURRENT_TIME_PREFIX}_{current_agent_hash}.jsonl"
+    )
+
+
 def save_result(
+    out_f: TextIO,
     tool: str,
     model: str,
     result: dict,
@@ -229,74 +301,86 @@ def save_result(
     prompt: str,
     resource_utilization: str,
 ) -> None:
-    """Save the result to a file."""
-    if not os.path.exists(TEST_RESULTS_DIR):
-        os.makedirs(TEST_RESULTS_DIR)
-    current_agent_hash = get_current_agent_hash()
-    filename = os.path.join(
-        TEST_RESULTS_DIR, f"{CURRENT_TIME_PREFIX}_{current_agent_hash}.jsonl"
+    """Append the result to the run's open results file."""
+    out_f.write(
+        json.dumps(
+            {
+                "timestamp": datetime.now().isoformat(),
+                "tool": tool,
+                "model": model,
+                "result": result,
+                "time_taken": time_taken,
+                "resource_utilization": resource_utilization,
+                "prompt": prompt,
+            }
+        )
+        + "\n"
     )
-    with open(filename, "a+", encoding="utf-8") as f:
-        f.write(
-            json.dumps(
-                {
-                    "timestamp": datetime.now().isoformat(),
-                    "tool": tool,
-                    "model": model,
-                    "result": result,
-                    "time_taken": time_taken,
-                    "resource_utilization": resource_utilization,
-                    "prompt": prompt,
-                }
+
+
+def run_one(tool: str, model: str, market: str, prompt: str) -> dict:
+    """Run a single tool/market combination and return its record or error."""
+    print(f"Testing tool: {tool} with model: {model}")
+    try:
+        # Keep the tool's own output off the shared console
+        with (
+            capture_metrit_stats() as captured_stats,
+            contextlib.redirect_stdout(StringIO()),
+        ):
+            start_time = timer()
+            result = (
+                test_prediction_tool(prompt, tool, model)
+                if "resolve-market-reasoning" not in tool
+                else test_market_resolution_tool(market, tool, model)
             )
-            + "\n"
+            end_time = timer()
+        elapsed_time = end_time - start_time
+
+        if not captured_stats:
+            raise ValueError("metrit did not report resource utilization stats")
+
+        resource_utilization = format_resource_utilization(captured_stats[-1])
+        print(
+            f"Time taken for tool {tool} with model {model}: {elapsed_time:.2f} seconds. Resource usage: {resource_utilization}"
         )
+        return {
+            "tool": tool,
+            "model": model,
+            "result": result,
+            "time_taken": f"{elapsed_time:.2f} seconds",
+            "prompt": prompt,
+            "resource_utilization": resource_utilization,
+        }
+    except Exception as e:
+        print(f"Error testing tool {tool} with model {model}: {e}")
+        return {"error": str(e)}
 
 
 def main() -> None:
     """Test the prediction request tool."""
-
-    for tool in TOOLS_TO_TEST:
-        model = MODEL_GPT if "cot" not in tool else MODEL_CLAUDE
-        for market, prompt in zip(MARKETS, PROMPTS):
-            print(f"Testing tool: {tool} with model: {model}")
-            try:
-                buffer = StringIO()
-                with contextlib.redirect_stdout(buffer):
-                    start_time = timer()
-                    result = (
-                        test_prediction_tool(prompt, tool, model)
-                        if "resolve-market-reasoning" not in tool
-                        else test_market_resolution_tool(market, tool, model)
-                    )
-                    end_time = timer()
-                elapsed_time = end_time - start_time
-
-                std_output = buffer.getvalue()
-                resource_utilization_match = re.search(
-                    REGEX_TO_EXTRACT_RESOURCE_STATS, std_output
-                )
-                if resource_utilization_match is None:
-                    raise ValueError(
-                        f"Could not find resource utilization stats in output: {std_output}"
-                    )
-
-                resource_utilization = re.search(
-                    REGEX_TO_EXTRACT_RESOURCE_STATS, buffer.getvalue()
-                ).group(0)
-                print(
-                    f"Time taken for tool {tool} with model {model}: {elapsed_time:.2f} seconds. Resource usage: {resource_utilization}"
-                )
-                save_result(
-                    tool,
-                    model,
-                    result,
-                    f"{elapsed_time:.2f} seconds",
-                    prompt,
-                    resource_utilization=resource_utilization,
-                )
-            except Exception as e:
-                print(f"Error testing tool {tool} with model {model}: {e}")
+    check_metrit_api()
+
+    jobs = [
+        (tool, MODEL_GPT if "cot" not in tool else MODEL_CLAUDE, market, prompt)
+        for tool in TOOLS_TO_TEST
+        for market, prompt in zip(MARKETS, PROMPTS)
+    ]
+
+    # metrit keeps per-process call state and redirect_stdout swaps the
+    # process-wide sys.stdout, so fan out over spawned processes (one job at a
+    # time each) rather than threads. Only the parent writes the
+    # results file, line-buffered so each result is on disk as soon as written.
+    with (
+        open(get_results_filepath(), "a", encoding="utf-8", buffering=1) as out_f,
+        ProcessPoolExecutor(
+            max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        ) as executor,
+    ):
+        futures = [executor.submit(run_one, *job) for job in jobs]
+        for future in as_completed(futures):
+            record = future.result()
+            if "error" not in record:
+                save_result(out_f, **record)
 
 
 if __name__ == "__main__":
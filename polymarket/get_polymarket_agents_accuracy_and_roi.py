@@ -1,9 +1,23 @@
+import hashlib
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Optional
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
 
 load_dotenv()
 
@@ -17,18 +31,72 @@ PERCENTAGE_FACTOR = 100.0
 USDC_DECIMALS_DIVISOR = 1_000_000
 WEI_IN_ETH = 1_000_000_000_000_000_000
 DEFAULT_MECH_FEE = 10_000_000_000_000_000  # 0.01 ETH (or POL) in wei
+REQUEST_TIMEOUT = 30
+PAGE_SIZE = 1000  # The Graph's max `first`; pages are keyed on id_gt, not skip
+AGENTS_PER_REQUEST = 25  # aliased agents per query; bounded by subgraph query cost
+MAX_WORKERS = 8  # concurrent batched subgraph requests
+
+# Disk cache TTL: re-query the subgraphs if a cached response is older than this
+CACHE_TTL_SECONDS = 15 * 60  # 15 minutes
+_CACHE_FILE = Path(__file__).parent / ".polymarket_agents_cache.json"
+
+# One keep-alive pool for every subgraph POST (The Graph gateway + Polymarket)
+SESSION = requests.Session()
+SESSION.headers.update({"Content-Type": "application/json"})
+SESSION.mount(
+    "https://", HTTPAdapter(pool_connections=4, pool_maxsize=64, max_retries=3)
+)
+
+
+# ---------------------------------------------------------------------------
+# Disk cache helpers
+# ---------------------------------------------------------------------------
+
+
+def _load_cache() -> dict:
+    """Load cache from disk. Returns empty dict on missing/corrupt file."""
+    if _CACHE_FILE.exists():
+        try:
+            return json.loads(_CACHE_FILE.read_text())
+        except (json.JSONDecodeError, OSError):
+            return {}
+    return {}
+
+
+def _save_cache(cache: dict) -> None:
+    """Persist cache dict to disk."""
+    _CACHE_FILE.write_text(json.dumps(cache))
+
+
+# In-memory cache loaded from disk at startup, keyed by a hash of
+# (url, query, variables):
+#   "<sha256>": {"fetched_at": <unix ts>, "response": {...}}
+_cache: dict = _load_cache()
+_cache_lock = threading.Lock()
+
+
+def _cache_key(subgraph_url, query, variables) -> str:
+    payload = json.dumps([subgraph_url, query, variables], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
 
 
 def call_subgraph(subgraph_url, query, variables):
-    response = requests.post(
-        subgraph_url,
-        json={"query": query, "variables": variables},
-        headers={
-            "Content-Type": "application/json",
-        },
-    )
+    key = _cache_key(subgraph_url, query, variables)
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry is not None and (time.time() - entry["fetched_at"]) <= CACHE_TTL_SECONDS:
+        return entry["response"]
+
+    payload = {"query": query, "variables": variables}
+    # orjson encodes/decodes the (large) bet payloads several times faster
+    body = orjson.dumps(payload) if _HAS_ORJSON else json.dumps(payload).encode()
+    response = SESSION.post(subgraph_url, data=body, timeout=REQUEST_TIMEOUT)
     if response.status_code == 200:
-        return response.json()
+        result = orjson.loads(response.content) if _HAS_ORJSON else response.json()
+        if "errors" not in result:
+            with _cache_lock:
+                _cache[key] = {"fetched_at": int(time.time()), "response": result}
+        return result
     else:
         print(f"Query failed with status code {response.status_code}")
         return None
@@ -36,35 +104,43 @@ def call_subgraph(subgraph_url, query, variables):
 
 def get_all_polystrat_agents():
     query = """
-{
-  services(where: {
-    agentIds_contains: [86]
-  },first: 1000) {
+query GetPolystratServices($lastId: ID!) {
+  services(
+    where: {id_gt: $lastId, agentIds_contains: [86]}
+    first: 1000
+    orderBy: id
+    orderDirection: asc
+  ) {
     id
     multisig
     agentIds
   }
 }
 """
-    response = call_subgraph(POLYGON_REGISTRY_SUBGRAPH_URL, query, {})
-    agents_safe_addresses = [
-        service["multisig"] for service in response["data"]["services"]
-    ]
+    agents_safe_addresses = []
+    last_id = ""
+    while True:
+        response = call_subgraph(
+            POLYGON_REGISTRY_SUBGRAPH_URL, query, {"lastId": last_id}
+        )
+        services = response["data"]["services"]
+        agents_safe_addresses.extend(service["multisig"] for service in services)
+        if len(services) < PAGE_SIZE:
+            break
+        last_id = services[-1]["id"]
     return agents_safe_addresses
 
 
-def fetch_agent_bets(safe_address: str) -> list:
-    """Fetch agent bets from Polymarket subgraph."""
-    query = """
-query GetPolymarketTraderAgentBets($id: ID!) {
-  marketParticipants(
-    where: {traderAgent_: {id: $id}}
-    first: 1000
-    orderBy: blockTimestamp
-    orderDirection: desc
-  ) {
+TRADER_AGENT_FIELDS = """
+    totalBets
+    totalPayout
+    totalTradedSettled
+"""
+
+# Only what calculate_agent_stats reads; participant `id` is the page cursor
+AGENT_BETS_FIELDS = """
+    id
     bets {
-      id
       outcomeIndex
       question {
         resolution {
@@ -74,74 +150,157 @@ query GetPolymarketTraderAgentBets($id: ID!) {
       amount
       shares
     }
-  }
-}
 """
-    response = call_subgraph(POLYMARKET_BETS_SUBGRAPH_URL, query, {"id": safe_address})
-    if (
-        not response
-        or "data" not in response
-        or "marketParticipants" not in response["data"]
-    ):
-        return []
-    # Flatten all bets from all marketParticipants
-    all_bets = []
-    for participant in response["data"]["marketParticipants"]:
-        bets = participant.get("bets", [])
-        for bet in bets:
-            all_bets.append(bet)
-
-    return all_bets
-
-
-def fetch_trader_agent(safe_address: str) -> Optional[dict]:
-    query = """
-query GetPolymarketTraderAgentPerformance($id: ID!) {
-  traderAgent(id: $id) {
-    serviceId
-    totalBets
-    totalPayout
-    totalTraded
-    totalTradedSettled
-  }
-}
+
+
+def _agent_selections(i: int) -> str:
+    """Aliased traderAgent + marketParticipants selections for agent $id{i}."""
+    return f"""
+  a{i}: traderAgent(id: $id{i}) {{{TRADER_AGENT_FIELDS}  }}
+  a{i}p: marketParticipants(
+    where: {{traderAgent_: {{id: $id{i}}}}}
+    first: 1000
+    orderBy: id
+    orderDirection: asc
+  ) {{{AGENT_BETS_FIELDS}  }}"""
+
+
+def fetch_remaining_participants(safe_address: str, last_id: str) -> list:
+    """Page through an agent's marketParticipants after `last_id` using id_gt."""
+    query = f"""
+query GetMarketParticipantsPage($id: ID!, $lastId: ID!) {{
+  marketParticipants(
+    where: {{traderAgent_: {{id: $id}}, id_gt: $lastId}}
+    first: 1000
+    orderBy: id
+    orderDirection: asc
+  ) {{{AGENT_BETS_FIELDS}  }}
+}}
 """
-    response = call_subgraph(POLYMARKET_BETS_SUBGRAPH_URL, query, {"id": safe_address})
+    participants = []
+    while True:
+        response = call_subgraph(
+            POLYMARKET_BETS_SUBGRAPH_URL,
+            query,
+            {"id": safe_address, "lastId": last_id},
+        )
+        page = _subgraph_data(response).get("marketParticipants") or []
+        participants.extend(page)
+        if len(page) < PAGE_SIZE:
+            return participants
+        last_id = page[-1]["id"]
 
-    # print(f"!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! {response=}")
-    return response["data"].get("traderAgent")
 
+def _subgraph_data(response: Optional[dict]) -> dict:
+    """The `data` of a subgraph response; raises if the request or query failed."""
+    if response is None:
+        raise RuntimeError("subgraph request failed")
+    if "errors" in response:
+        raise RuntimeError(f"subgraph errors: {response['errors']}")
+    return response.get("data") or {}
 
-def get_resolved_bets(bets: list) -> list:
-    """Filter bets to only include those on resolved markets."""
-    resolved_bets = [
-        bet for bet in bets if bet.get("question", {}).get("resolution") is not None
-    ]
-    return resolved_bets
 
+def fetch_agents_batch(safe_addresses: list[str]) -> list[tuple[list, Optional[dict]]]:
+    """
+    Fetch bets and traderAgent totals for several agents in one subgraph
+    request using aliased selections. Returns (bets, trader_agent) per address,
+    in input order. Raises RuntimeError if the request fails.
+    """
+    var_defs = ", ".join(f"$id{i}: ID!" for i in range(len(safe_addresses)))
+    selections = "".join(_agent_selections(i) for i in range(len(safe_addresses)))
+    query = f"query GetPolymarketTraderAgents({var_defs}) {{{selections}\n}}"
+    variables = {f"id{i}": address for i, address in enumerate(safe_addresses)}
 
-def calculate_polymarket_accuracy(bets: list) -> float:
-    """Calculate prediction accuracy for Polymarket markets."""
-    bets_on_resolved_markets = get_resolved_bets(bets)
-    if len(bets_on_resolved_markets) == 0:
-        return None
+    data = _subgraph_data(call_subgraph(POLYMARKET_BETS_SUBGRAPH_URL, query, variables))
+
+    results = []
+    for i, safe_address in enumerate(safe_addresses):
+        participants = data.get(f"a{i}p") or []
+        if len(participants) == PAGE_SIZE:
+            participants += fetch_remaining_participants(
+                safe_address, participants[-1]["id"]
+            )
+
+        # Flatten all bets from all marketParticipants
+        all_bets = []
+        for participant in participants:
+            bets = participant.get("bets", [])
+            for bet in bets:
+                all_bets.append(bet)
+        results.append((all_bets, data.get(f"a{i}")))
+    return results
+
+
+def fetch_agents_batch_or_singly(
+    safe_addresses: list[str],
+) -> list[Optional[tuple[list, Optional[dict]]]]:
+    """
+    `fetch_agents_batch`, retrying the agents one at a time if the batched
+    request fails. Agents that still fail map to None.
+    """
+    try:
+        return fetch_agents_batch(safe_addresses)
+    except RuntimeError as e:
+        print(
+            f"Batch of {len(safe_addresses)} agents failed ({e}), retrying one at a time."
+        )
+    results = []
+    for safe_address in safe_addresses:
+        try:
+            results.extend(fetch_agents_batch([safe_address]))
+        except RuntimeError as e:
+            print(f"Failed to fetch agent {safe_address}: {e}")
+            results.append(None)
+    return results
+
+
+@dataclass
+class AgentStats:
+    """Per-agent bet statistics gathered in a single pass over the bets."""
+
+    accuracy: Optional[float]
+    resolved: int
+    total: int
+    avg_amount: float
+    avg_share_price: float
+
+
+def calculate_agent_stats(bets: list) -> AgentStats:
+    """Compute accuracy, resolved count and averages for Polymarket bets in one pass."""
+    resolved_bets = 0
     won_bets = 0
-    total_bets = 0
-    for bet in bets_on_resolved_markets:
-        resolution = bet.get("question", {}).get("resolution", {})
+    scored_bets = 0
+    total_amount = 0
+    total_share_price = 0.0
+    for bet in bets:
+        amount = int(bet.get("amount", 0))
+        shares = int(bet.get("shares", 0))
+        total_amount += amount
+        if shares > 0:
+            total_share_price += amount / shares
+
+        resolution = bet.get("question", {}).get("resolution")
+        if resolution is None:
+            continue
+        resolved_bets += 1
         winning_index = resolution.get("winningIndex")
         outcome_index = bet.get("outcomeIndex")
         if winning_index is None or outcome_index is None:
             continue
         if int(winning_index) < 0:
             continue
-        total_bets += 1
+        scored_bets += 1
         if int(outcome_index) == int(winning_index):
             won_bets += 1
-    if total_bets == 0:
-        return None
-    win_rate = (won_bets / total_bets) * PERCENTAGE_FACTOR
-    return win_rate
+
+    accuracy = (won_bets / scored_bets) * PERCENTAGE_FACTOR if scored_bets > 0 else None
+    return AgentStats(
+        accuracy=accuracy,
+        resolved=resolved_bets,
+        total=len(bets),
+        avg_amount=(total_amount / len(bets)) if bets else 0,
+        avg_share_price=(total_share_price / len(bets)) if bets else 0,
+    )
 
 
 def calculate_partial_roi(trader_agent: dict) -> Optional[float]:
@@ -166,23 +325,9 @@ def calculate_partial_roi(trader_agent: dict) -> Optional[float]:
     return partial_roi
 
 
-def get_accuracy_and_roi_for_agent(agent_safe_address):
-    bets = fetch_agent_bets(agent_safe_address)
-    accuracy = calculate_polymarket_accuracy(bets)
-    resolved_bets = get_resolved_bets(bets)
-    avg_bet_amount = (
-        (sum(int(bet.get("amount", 0)) for bet in bets) / len(bets)) if bets else 0
-    )
-    share_prices = [
-        (
-            int(bet.get("amount", 0)) / int(bet.get("shares", 1))
-            if int(bet.get("shares", 0)) > 0
-            else 0
-        )
-        for bet in bets
-    ]
-    avg_share_price = (sum(share_prices) / len(share_prices)) if share_prices else 0
-    trader_agent = fetch_trader_agent(agent_safe_address)
+def get_accuracy_and_roi_for_agent(agent_safe_address, bets, trader_agent):
+    stats = calculate_agent_stats(bets)
+    accuracy = stats.accuracy
     roi = calculate_partial_roi(trader_agent)
     if accuracy is None or roi is None:
         print(
@@ -193,7 +338,7 @@ def get_accuracy_and_roi_for_agent(agent_safe_address):
         #     f"Agent {agent_safe_address} has an accuracy of {accuracy:.2f}% with {len(bets)} bets"
         # )
         print(
-            f"Agent {agent_safe_address} has an accuracy of {accuracy:.2f}% with {len(resolved_bets)}/{len(bets)} resolved bets and a partial ROI of {roi:.2f}%. AVG bet amount: {(avg_bet_amount/USDC_DECIMALS_DIVISOR):2f} USDC and AVG share price: {avg_share_price:.2f} USDC"
+            f"Agent {agent_safe_address} has an accuracy of {accuracy:.2f}% with {stats.resolved}/{stats.total} resolved bets and a partial ROI of {roi:.2f}%. AVG bet amount: {(stats.avg_amount/USDC_DECIMALS_DIVISOR):2f} USDC and AVG share price: {stats.avg_share_price:.2f} USDC"
         )
     return accuracy, roi
 
@@ -205,11 +350,26 @@ def main():
     total_accuracy = 0
     total_roi = 0
     count_with_accuracy = 0
-    c = 0
-    for safe_address in agent_safe_addresses:
-        # print(f"\n{c=}   {safe_address=}")
-        # c += 1
-        accuracy, roi = get_accuracy_and_roi_for_agent(safe_address)
+    results = []
+    failed_addresses = []
+    batches = []
+    for start in range(0, len(agent_safe_addresses), AGENTS_PER_REQUEST):
+        end = start + AGENTS_PER_REQUEST
+        batches.append(agent_safe_addresses[start:end])
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        batch_results = list(executor.map(fetch_agents_batch_or_singly, batches))
+
+    for batch, agents_data in zip(batches, batch_results):
+        for safe_address, agent_data in zip(batch, agents_data):
+            if agent_data is None:
+                failed_addresses.append(safe_address)
+                continue
+            bets, trader_agent = agent_data
+            results.append(
+                get_accuracy_and_roi_for_agent(safe_address, bets, trader_agent)
+            )
+
+    for accuracy, roi in results:
         if accuracy is None or roi is None:
             continue
 
@@ -226,6 +386,21 @@ def main():
         print(
             f"Average partial ROI across {count_with_accuracy} agents: {avg_roi:.2f}%"
         )
+    if failed_addresses:
+        print(
+            f"Could not fetch {len(failed_addresses)} agent(s), excluded from the averages: {', '.join(failed_addresses)}"
+        )
 
 
-main()
+try:
+    main()
+finally:
+    SESSION.close()
+    now = time.time()
+    _save_cache(
+        {
+            key: entry
+            for key, entry in _cache.items()
+            if now - entry["fetched_at"] <= CACHE_TTL_SECONDS
+        }
+    )
@@ -2,13 +2,22 @@ import base64
 import hashlib
 import hmac
 import os
+import ssl
 import time
 from typing import Optional
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel
 
+try:
+    import orjson  # noqa: F401  (required by ORJSONResponse)
+
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
+
 load_dotenv()
 
 # ------------------------------------------------------------------------------
@@ -22,11 +31,34 @@ BUILDER_PASSPHRASE = os.getenv("BUILDER_PASS_PHRASE")
 if not all([BUILDER_API_KEY, BUILDER_SECRET, BUILDER_PASSPHRASE]):
     raise RuntimeError("Missing one or more BUILDER_* environment variables")
 
+# /sign is bound by HMAC-SHA256; the OpenSSL-backed hashlib uses SHA-NI where the
+# CPU has it, the builtin _sha2 fallback does not
+if hashlib.sha256.__module__ != "_hashlib":
+    print(
+        f"⚠️  hashlib.sha256 is not OpenSSL-backed ({hashlib.sha256.__module__}); "
+        "signing will not use hardware SHA acceleration"
+    )
+print(f"🔐 HMAC-SHA256 via {ssl.OPENSSL_VERSION}")
+
+# The secret is fixed for the process lifetime: decode it and run the HMAC key
+# schedule once, then copy() the keyed template per request
+_SECRET_BYTES = base64.urlsafe_b64decode(BUILDER_SECRET)
+_HMAC_TEMPLATE = hmac.new(_SECRET_BYTES, b"", hashlib.sha256)
+
+# Headers that are identical on every /sign response
+_STATIC_HEADERS = {
+    "POLY_BUILDER_API_KEY": BUILDER_API_KEY,
+    "POLY_BUILDER_PASSPHRASE": BUILDER_PASSPHRASE,
+}
+
 # ------------------------------------------------------------------------------
 # FastAPI app
 # ------------------------------------------------------------------------------
 
-app = FastAPI(title="Polymarket Builder Signing Service")
+app = FastAPI(
+    title="Polymarket Builder Signing Service",
+    default_response_class=ORJSONResponse if _HAS_ORJSON else JSONResponse,
+)
 
 
 # ------------------------------------------------------------------------------
@@ -46,19 +78,18 @@ class SignResponse(BaseModel):
 
 
 def build_hmac_signature(
-    secret: str, timestamp: str, method: str, requestPath: str, body=None
+    timestamp: bytes, method: bytes, requestPath: bytes, body: bytes = b""
 ):
     """
-    Creates an HMAC signature by signing a payload with the secret
+    Creates an HMAC signature by signing a payload with the builder secret
     """
-    base64_secret = base64.urlsafe_b64decode(secret)
-    message = str(timestamp) + str(method) + str(requestPath)
     if body:
         # NOTE: Necessary to replace single quotes with double quotes
         # to generate the same hmac message as go and typescript
-        message += str(body).replace("'", '"')
+        body = body.replace(b"'", b'"')
 
-    h = hmac.new(base64_secret, bytes(message, "utf-8"), hashlib.sha256)
+    h = _HMAC_TEMPLATE.copy()
+    h.update(b"".join((timestamp, method, requestPath, body)))
 
     # ensure base64 encoded
     return (base64.urlsafe_b64encode(h.digest())).decode("utf-8")
@@ -69,27 +100,28 @@ def build_hmac_signature(
 # ------------------------------------------------------------------------------
 
 
-@app.post("/sign", response_model=SignResponse)
-def sign(req: SignRequest):
+# Pure CPU and non-blocking, so run on the event loop rather than the threadpool.
+# SignResponse documents the schema only; the handler returns a plain dict, so
+# skip response_model validation/serialization on every request
+@app.post("/sign", response_model=None, responses={200: {"model": SignResponse}})
+async def sign(req: SignRequest):
     """
     Receives { method, path, body } and returns Polymarket Builder headers
     """
     try:
-        timestamp = str(int(time.time()))
+        timestamp = str(time.time_ns() // 1_000_000_000)
 
         signature = build_hmac_signature(
-            BUILDER_SECRET,
-            timestamp,
-            req.method.upper(),
-            req.path,
-            req.body or "",
+            timestamp.encode(),
+            req.method.upper().encode(),
+            req.path.encode(),
+            (req.body or "").encode(),
         )
 
         return {
             "POLY_BUILDER_SIGNATURE": signature,
             "POLY_BUILDER_TIMESTAMP": timestamp,
-            "POLY_BUILDER_API_KEY": BUILDER_API_KEY,
-            "POLY_BUILDER_PASSPHRASE": BUILDER_PASSPHRASE,
+            **_STATIC_HEADERS,
         }
 
     except Exception as e:
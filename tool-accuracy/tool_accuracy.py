@@ -11,12 +11,39 @@ Usage:
 """
 
 import json
+import sqlite3
 import sys
 import time
-from collections import defaultdict
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
+
+try:
+    import ijson
+
+    _HAS_IJSON = True
+except ImportError:
+    _HAS_IJSON = False
+
+try:
+    import marisa_trie
+
+    _HAS_MARISA = True
+except ImportError:
+    _HAS_MARISA = False
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -31,50 +58,141 @@ QUESTION_DATA_SEPARATOR = "\u241f"
 # Lookback window for mech requests (7 days)
 MECH_LOOKBACK_SECONDS = 14 * 24 * 60 * 60
 
-# Disk cache TTL: re-fetch an agent's requests if the cached data is older than this
-MECH_CACHE_TTL_SECONDS = 60 * 60  # 1 hour
-
-# Disk cache file (next to this script)
-_CACHE_FILE = Path(__file__).parent / ".mech_cache.json"
+# One keep-alive pool for the bets and mech subgraphs, so each page/agent reuses
+# the TLS connection instead of paying a fresh handshake
+_SESSION = requests.Session()
+_SESSION.headers.update({"Content-Type": "application/json"})
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=32,
+        # GraphQL reads are idempotent, so let POSTs be retried too
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=None,
+        ),
+    ),
+)
 
+# Mech requests are fetched from this long before the oldest bet onwards
+MECH_BET_SLACK_SECONDS = 60 * 60  # 1 hour
 
-def _load_cache() -> dict:
-    """Load the disk cache from file. Returns an empty dict if file doesn't exist or is corrupt."""
-    if _CACHE_FILE.exists():
-        try:
-            return json.loads(_CACHE_FILE.read_text())
-        except (json.JSONDecodeError, OSError):
-            return {}
-    return {}
+# Disk cache TTL: re-fetch an agent's requests if the cached data is older than this
+MECH_CACHE_TTL_SECONDS = 60 * 60  # 1 hour
 
+# Concurrent mech fetches on a cold cache, each carrying up to
+# MECH_AGENTS_PER_REQUEST aliased senders (bounded by subgraph query cost)
+MECH_FETCH_WORKERS = 16
+MECH_AGENTS_PER_REQUEST = 25
+
+# Disk cache (next to this script). Shared by tool_accuracy.py and
+# tool_accuracy_polymarket.py, so rows are keyed by subgraph as well as agent.
+_CACHE_DB = Path(__file__).parent / ".mech_cache.sqlite"
+_cache_conn = None
+
+
+def _get_cache() -> sqlite3.Connection:
+    """Open (once) the on-disk mech request cache."""
+    global _cache_conn
+    if _cache_conn is None:
+        _cache_conn = sqlite3.connect(_CACHE_DB)
+        # WAL lets one script read while the other is writing
+        _cache_conn.execute("PRAGMA journal_mode=WAL")
+        _cache_conn.execute(
+            "CREATE TABLE IF NOT EXISTS mech_cache ("
+            "subgraph_url TEXT, agent TEXT, fetched_at INTEGER, "
+            "fetched_from INTEGER, requests BLOB, "
+            "PRIMARY KEY (subgraph_url, agent))"
+        )
+    return _cache_conn
 
-def _save_cache(cache: dict) -> None:
-    """Persist the cache dict to disk."""
-    _CACHE_FILE.write_text(json.dumps(cache))
 
+def _is_cache_entry_usable(agent_address: str, timestamp_gt: int) -> bool:
+    """A cached entry is usable if it is fresh and covers back to `timestamp_gt`."""
+    row = (
+        _get_cache()
+        .execute(
+            "SELECT fetched_at, fetched_from FROM mech_cache "
+            "WHERE subgraph_url = ? AND agent = ?",
+            (OLAS_MECH_SUBGRAPH_URL, agent_address),
+        )
+        .fetchone()
+    )
+    if row is None:
+        return False
+    fetched_at, fetched_from = row
+    return (
+        time.time() - fetched_at
+    ) <= MECH_CACHE_TTL_SECONDS and fetched_from <= timestamp_gt
+
+
+def _load_cached_requests(agent_address: str) -> list[dict]:
+    row = (
+        _get_cache()
+        .execute(
+            "SELECT requests FROM mech_cache WHERE subgraph_url = ? AND agent = ?",
+            (OLAS_MECH_SUBGRAPH_URL, agent_address),
+        )
+        .fetchone()
+    )
+    if row is None:
+        return []
+    return orjson.loads(row[0]) if _HAS_ORJSON else json.loads(row[0])
+
+
+def _save_cached_requests(
+    requests_by_agent: dict[str, list[dict]], timestamp_gt: int
+) -> None:
+    """Store freshly fetched requests for several agents in one transaction."""
+    fetched_at = int(time.time())
+    conn = _get_cache()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO mech_cache "
+            "(subgraph_url, agent, fetched_at, fetched_from, requests) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    OLAS_MECH_SUBGRAPH_URL,
+                    agent,
+                    fetched_at,
+                    timestamp_gt,
+                    orjson.dumps(reqs) if _HAS_ORJSON else json.dumps(reqs).encode(),
+                )
+                for agent, reqs in requests_by_agent.items()
+            ],
+        )
 
-# In-memory cache loaded from disk at startup
-# Structure: {agent_address: {"fetched_at": <unix timestamp>, "requests": [...]}}
-_mech_cache: dict = _load_cache()
 
 # ---------------------------------------------------------------------------
 # GraphQL queries
 # ---------------------------------------------------------------------------
 
-GET_MECH_SENDER_QUERY = """
-query MechSender($id: ID!, $timestamp_gt: Int!, $skip: Int, $first: Int) {
-    sender(id: $id) {
-        totalMarketplaceRequests
-        requests(first: $first, skip: $skip, where: { blockTimestamp_gt: $timestamp_gt }) {
+# Shared by the single-agent query and the aliased multi-agent query. Only the
+# fields the matching reads: prompts are large and never used here.
+MECH_REQUESTS_SELECTION = """
+        requests(
+            first: $first
+            skip: $skip
+            orderBy: blockTimestamp
+            orderDirection: desc
+            where: { blockTimestamp_gt: $timestamp_gt }
+        ) {
             blockTimestamp
             parsedRequest {
                 questionTitle
                 tool
-                prompt
             }
-        }
-    }
-}
+        }"""
+
+GET_MECH_SENDER_QUERY = f"""
+query MechSender($id: ID!, $timestamp_gt: Int!, $skip: Int, $first: Int) {{
+    sender(id: $id) {{{MECH_REQUESTS_SELECTION}
+    }}
+}}
 """
 
 # ---------------------------------------------------------------------------
@@ -82,18 +200,33 @@ query MechSender($id: ID!, $timestamp_gt: Int!, $skip: Int, $first: Int) {
 # ---------------------------------------------------------------------------
 
 
+# Nearly every resolved market's bytes32 currentAnswer is outcome 0 or 1
+_COMMON_ANSWERS = {"0x" + "0" * 64: 0, "0x" + "0" * 63 + "1": 1}
+
+
+def parse_current_answer(current_answer: str) -> int:
+    """Decode a market's `currentAnswer` hex string to an outcome index."""
+    correct = _COMMON_ANSWERS.get(current_answer)
+    return int(current_answer, 16) if correct is None else correct
+
+
 def fetch_last_bets(n: int = 100, batch_size: int = 1000) -> list[dict]:
     """
     Fetch the last `n` resolved bets from the predict-omen subgraph.
     Only includes bets where the market has a current (resolved) answer.
     Paginates automatically when `n` exceeds the subgraph page limit.
     """
-    headers = {"Content-Type": "application/json"}
     all_raw_bets: list[dict] = []
+    # The initial offset into history is only applied to the first page; later
+    # pages use a timestamp cursor so the subgraph never re-scans skipped rows.
     skip = 50000
+    cursor_ts = None
+    # Bet ids already taken at `cursor_ts`; timestamp_lte re-returns them
+    seen_at_cursor: set[str] = set()
 
     while len(all_raw_bets) < n:
-        first = min(batch_size, n - len(all_raw_bets))
+        first = min(batch_size, n - len(all_raw_bets) + len(seen_at_cursor))
+        cursor_filter = "" if cursor_ts is None else f", timestamp_lte: {cursor_ts}"
         query = f"""
     {{
       bets(
@@ -101,7 +234,7 @@ def fetch_last_bets(n: int = 100, batch_size: int = 1000) -> list[dict]:
         skip: {skip}
         orderBy: timestamp
         orderDirection: desc
-        where: {{fixedProductMarketMaker_: {{currentAnswer_not: null}}}}
+        where: {{fixedProductMarketMaker_: {{currentAnswer_not: null}}{cursor_filter}}}
       ) {{
         id
         timestamp
@@ -117,23 +250,28 @@ def fetch_last_bets(n: int = 100, batch_size: int = 1000) -> list[dict]:
       }}
     }}
     """
-        response = requests.post(
-            PREDICT_OMEN_URL, headers=headers, json={"query": query}, timeout=30
-        )
+        response = _SESSION.post(PREDICT_OMEN_URL, json={"query": query}, timeout=30)
         response.raise_for_status()
         data = response.json()
         batch = data["data"]["bets"]
-        if not batch:
+        new_bets = [bet for bet in batch if bet["id"] not in seen_at_cursor]
+        if not new_bets:
             break
-        all_raw_bets.extend(batch)
+        all_raw_bets.extend(new_bets)
         if len(batch) < first:
             break
-        skip += first
+
+        last_ts = batch[-1]["timestamp"]
+        if last_ts != cursor_ts:
+            seen_at_cursor = set()
+        cursor_ts = last_ts
+        seen_at_cursor.update(bet["id"] for bet in batch if bet["timestamp"] == last_ts)
+        skip = 0
 
     formatted_bets = []
-    for bet in all_raw_bets:
+    for bet in all_raw_bets[:n]:
         chosen = int(bet["outcomeIndex"])
-        correct = int(bet["fixedProductMarketMaker"]["currentAnswer"], 16)
+        correct = parse_current_answer(bet["fixedProductMarketMaker"]["currentAnswer"])
         formatted_bets.append(
             {
                 "bet_id": bet["id"],
@@ -144,6 +282,9 @@ def fetch_last_bets(n: int = 100, batch_size: int = 1000) -> list[dict]:
                 "correct_outcome": correct,
                 "is_correct": chosen == correct,
                 "question": bet["fixedProductMarketMaker"]["question"],
+                "_norm_title": extract_question_title(
+                    bet["fixedProductMarketMaker"]["question"]
+                ).strip(),
             }
         )
     return formatted_bets
@@ -158,16 +299,16 @@ def fetch_all_mech_requests(
     agent_address: str,
     timestamp_gt: int = None,
     batch_size: int = 1000,
+    skip: int = 0,
 ) -> list[dict]:
     """
     Fetch all mech requests for a given agent address from the subgraph.
-    Paginates automatically. Defaults to the last 7 days.
+    Paginates automatically, starting at `skip`. Defaults to the last 7 days.
     """
     if timestamp_gt is None:
         timestamp_gt = int(time.time()) - MECH_LOOKBACK_SECONDS
 
     all_requests = []
-    skip = 0
     while True:
         variables = {
             "id": agent_address,
@@ -175,16 +316,26 @@ def fetch_all_mech_requests(
             "skip": skip,
             "first": batch_size,
         }
-        response = requests.post(
+        response = _SESSION.post(
             OLAS_MECH_SUBGRAPH_URL,
             json={"query": GET_MECH_SENDER_QUERY, "variables": variables},
-            headers={"Content-Type": "application/json"},
             timeout=30,
+            stream=_HAS_IJSON,
         )
         response.raise_for_status()
-        data = response.json()
-        result = data.get("data", {}).get("sender") or {}
-        batch_requests = result.get("requests", [])
+        if _HAS_IJSON:
+            # Stream each request straight into its compact cached form instead
+            # of materializing the whole response tree first
+            response.raw.decode_content = True
+            with response:
+                batch_requests = [
+                    _compact_mech_request(req)
+                    for req in ijson.items(response.raw, "data.sender.requests.item")
+                ]
+        else:
+            data = response.json()
+            result = data.get("data", {}).get("sender") or {}
+            batch_requests = result.get("requests", [])
         if not batch_requests:
             break
         all_requests.extend(batch_requests)
@@ -194,22 +345,140 @@ def fetch_all_mech_requests(
     return all_requests
 
 
+def _compact_mech_request(req: dict) -> dict:
+    """Keep only what matching needs, with the title already normalized."""
+    return {
+        "blockTimestamp": req.get("blockTimestamp"),
+        "parsedRequest": {"tool": (req.get("parsedRequest") or {}).get("tool")},
+        "_norm_title": normalize_mech_title(req),
+    }
+
+
+@lru_cache(maxsize=None)
+def _mech_senders_query(n_agents: int) -> str:
+    """
+    Query aliasing one `sender` selection per agent (`a0` .. `a{n-1}`), with the
+    addresses passed as `$id0` .. `$id{n-1}`. Generated once per alias count.
+    """
+    var_defs = "".join(f", $id{i}: ID!" for i in range(n_agents))
+    selections = "".join(
+        f"\n    a{i}: sender(id: $id{i}) {{{MECH_REQUESTS_SELECTION}\n    }}"
+        for i in range(n_agents)
+    )
+    return (
+        f"query MechSenders($timestamp_gt: Int!, $skip: Int, $first: Int{var_defs}) "
+        f"{{{selections}\n}}"
+    )
+
+
+def fetch_mech_requests_multi(
+    agent_addresses: list[str],
+    timestamp_gt: int = None,
+    batch_size: int = 1000,
+) -> dict[str, list[dict]]:
+    """
+    Fetch mech requests for several agents in one subgraph request by aliasing
+    a `sender` selection per agent. Agents whose first page is full are paged
+    further individually. Returns {agent_address: requests}. Raises RuntimeError
+    if the subgraph reports errors, so a failed fetch is never cached as empty.
+    """
+    if timestamp_gt is None:
+        timestamp_gt = int(time.time()) - MECH_LOOKBACK_SECONDS
+
+    query = _mech_senders_query(len(agent_addresses))
+    variables = {"timestamp_gt": timestamp_gt, "skip": 0, "first": batch_size}
+    variables.update({f"id{i}": agent for i, agent in enumerate(agent_addresses)})
+
+    response = _SESSION.post(
+        OLAS_MECH_SUBGRAPH_URL,
+        json={"query": query, "variables": variables},
+        timeout=30,
+    )
+    response.raise_for_status()
+    data = response.json()
+    if "errors" in data or "data" not in data:
+        raise RuntimeError(f"Subgraph error (mech): {data.get('errors', data)}")
+    data = data["data"] or {}
+
+    results = {}
+    for i, agent in enumerate(agent_addresses):
+        batch_requests = (data.get(f"a{i}") or {}).get("requests", [])
+        results[agent] = [_compact_mech_request(req) for req in batch_requests]
+        if len(batch_requests) == batch_size:
+            results[agent] += fetch_all_mech_requests(
+                agent, timestamp_gt, batch_size, skip=batch_size
+            )
+    return results
+
+
+def mech_window_start(min_bet_ts: int = None) -> int:
+    """
+    Earliest mech request timestamp worth fetching: the lookback window, narrowed
+    to MECH_BET_SLACK_SECONDS before the oldest bet when that is later.
+    """
+    timestamp_gt = int(time.time()) - MECH_LOOKBACK_SECONDS
+    if min_bet_ts is not None:
+        timestamp_gt = max(timestamp_gt, min_bet_ts - MECH_BET_SLACK_SECONDS)
+    return timestamp_gt
+
+
 def get_mech_requests_cached(
     agent_address: str, timestamp_gt: int = None
 ) -> list[dict]:
     """
     Returns mech requests for the given agent, using a disk-backed cache.
-    Re-fetches if the cached entry is missing or older than MECH_CACHE_TTL_SECONDS.
+    Re-fetches if the cached entry is missing, older than MECH_CACHE_TTL_SECONDS
+    or does not reach back to `timestamp_gt`.
     """
-    entry = _mech_cache.get(agent_address)
-    if entry is None or (time.time() - entry["fetched_at"]) > MECH_CACHE_TTL_SECONDS:
-        requests_data = fetch_all_mech_requests(agent_address, timestamp_gt)
-        _mech_cache[agent_address] = {
-            "fetched_at": int(time.time()),
-            "requests": requests_data,
-        }
-        _save_cache(_mech_cache)
-    return _mech_cache[agent_address]["requests"]
+    if timestamp_gt is None:
+        timestamp_gt = mech_window_start()
+    if _is_cache_entry_usable(agent_address, timestamp_gt):
+        return _load_cached_requests(agent_address)
+
+    requests_data = add_normalized_titles(
+        fetch_all_mech_requests(agent_address, timestamp_gt)
+    )
+    _save_cached_requests({agent_address: requests_data}, timestamp_gt)
+    return requests_data
+
+
+def prefetch_mech_requests(agent_addresses: set[str], timestamp_gt: int) -> None:
+    """
+    Fetch mech requests newer than `timestamp_gt` for every agent missing from
+    (or stale in) the cache concurrently, then seed the cache.
+    """
+    stale = [
+        agent
+        for agent in agent_addresses
+        if not _is_cache_entry_usable(agent, timestamp_gt)
+    ]
+    if not stale:
+        return
+
+    # Spread the agents over every worker before packing more aliases into
+    # one request, so small cold runs still fetch in parallel
+    chunk_size = min(MECH_AGENTS_PER_REQUEST, -(-len(stale) // MECH_FETCH_WORKERS))
+    chunks = []
+    for start in range(0, len(stale), chunk_size):
+        end = start + chunk_size
+        chunks.append(stale[start:end])
+    with ThreadPoolExecutor(max_workers=MECH_FETCH_WORKERS) as executor:
+        futures = [
+            executor.submit(fetch_mech_requests_multi, chunk, timestamp_gt)
+            for chunk in chunks
+        ]
+        # The cache is only written here, on the calling thread, as each chunk
+        # arrives while the others are still in flight
+        for future in as_completed(futures):
+            try:
+                chunk_results = future.result()
+            except (requests.RequestException, RuntimeError) as e:
+                # Left uncached, so these agents are fetched one by one later
+                print(f"  [warn] Batched mech request fetch failed: {e}")
+                continue
+            for requests_data in chunk_results.values():
+                add_normalized_titles(requests_data)
+            _save_cached_requests(chunk_results, timestamp_gt)
 
 
 # ---------------------------------------------------------------------------
@@ -224,10 +493,67 @@ def extract_question_title(question: str) -> str:
     return question.split(QUESTION_DATA_SEPARATOR)[0]
 
 
-def match_bet_to_mech_request(bet: dict, mech_requests: list[dict]) -> list[dict]:
+def normalize_mech_title(req: dict) -> str:
+    """Question title of a mech request with the data suffix and whitespace removed."""
+    return extract_question_title(
+        (req.get("parsedRequest") or {}).get("questionTitle", "")
+    ).strip()
+
+
+def add_normalized_titles(mech_requests: list[dict]) -> list[dict]:
     """
-    Given a bet and a list of mech requests for the same agent, return the
-    mech requests whose questionTitle matches the bet's question.
+    Store each request's normalized title under `_norm_title` so it is computed
+    once per fetch and persisted with the disk cache.
+    """
+    for req in mech_requests:
+        if "_norm_title" not in req:
+            req["_norm_title"] = normalize_mech_title(req)
+    return mech_requests
+
+
+# Title index for one agent's mech requests:
+#   (sorted unique titles, {title: [(position, request), ...]}, shortest title length,
+#    trie of the titles or None when marisa-trie is not installed)
+TitleIndex = tuple[list[str], dict[str, list[tuple[int, dict]]], int, object]
+
+
+def build_title_index(mech_requests: list[dict]) -> TitleIndex:
+    """Index an agent's mech requests by normalized question title."""
+    by_title: dict[str, list[tuple[int, dict]]] = defaultdict(list)
+    for position, req in enumerate(mech_requests):
+        # Entries cached before `_norm_title` existed are normalized here
+        mech_title = req.get("_norm_title")
+        if mech_title is None:
+            mech_title = normalize_mech_title(req)
+        if mech_title:
+            by_title[mech_title].append((position, req))
+    titles = sorted(by_title)
+    trie = marisa_trie.Trie(titles) if _HAS_MARISA else None
+    return titles, by_title, min(map(len, titles), default=0), trie
+
+
+def _common_prefix_len(a: str, b: str, limit: int) -> int:
+    """Length of the common prefix of `a` and `b`, capped at `limit`."""
+    n = min(len(a), len(b), limit)
+    if a[:n] == b[:n]:
+        return n
+    # Binary search on slice equality keeps the character compares in C:
+    # a[:lo] == b[:lo] and a[:hi] != b[:hi] hold throughout
+    lo, hi = 0, n
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+def match_bet_to_mech_request(bet: dict, title_index: TitleIndex) -> list[dict]:
+    """
+    Given a bet and the title index of the same agent's mech requests, return
+    the mech requests whose questionTitle matches the bet's question, in their
+    original order.
 
     The mech subgraph truncates questionTitle, so an exact match is not always
     possible. A match is accepted when either string is a prefix of the other
@@ -235,20 +561,42 @@ def match_bet_to_mech_request(bet: dict, mech_requests: list[dict]) -> list[dict
       mech:    "...captain of the seized oil tanker "   (truncated)
       predict: "...captain of the seized oil tanker \"Grinch\" in connection..."
     """
-    bet_title = extract_question_title(bet.get("question", "")).strip()
+    bet_title = bet["_norm_title"]
     if not bet_title:
         return []
 
-    matched = []
-    for req in mech_requests:
-        mech_title = extract_question_title(
-            (req.get("parsedRequest") or {}).get("questionTitle", "")
-        ).strip()
-        if not mech_title:
-            continue
-        if bet_title.startswith(mech_title) or mech_title.startswith(bet_title):
-            matched.append(req)
-    return matched
+    titles, by_title, min_len, trie = title_index
+    if trie is not None:
+        # Mech titles that prefix the bet title, plus those it prefixes
+        matched = set(trie.prefixes(bet_title))
+        matched.update(trie.keys(bet_title))
+        found = [item for title in matched for item in by_title[title]]
+        found.sort(key=lambda item: item[0])
+        return [req for _, req in found]
+
+    found = []
+    idx = bisect_left(titles, bet_title)
+
+    # Mech titles starting with the bet title form a contiguous run from idx
+    j = idx
+    while j < len(titles) and titles[j].startswith(bet_title):
+        found.extend(by_title[titles[j]])
+        j += 1
+
+    # Mech titles that prefix the bet title sort before it, and also prefix every
+    # title in between, so walk back until the shared prefix is too short
+    bound = len(bet_title)
+    j = idx - 1
+    while j >= 0:
+        bound = _common_prefix_len(titles[j], bet_title, bound)
+        if bound < min_len:
+            break
+        if bound == len(titles[j]):
+            found.extend(by_title[titles[j]])
+        j -= 1
+
+    found.sort(key=lambda item: item[0])
+    return [req for _, req in found]
 
 
 # ---------------------------------------------------------------------------
@@ -256,54 +604,60 @@ def match_bet_to_mech_request(bet: dict, mech_requests: list[dict]) -> list[dict
 # ---------------------------------------------------------------------------
 
 
-def enrich_bets_with_tool(bets: list[dict]) -> list[dict]:
+def enrich_and_count(bets: list[dict]) -> tuple[Counter, Counter]:
     """
-    For each bet, fetch the corresponding agent's mech requests (cached),
-    match by question title, and attach the `tool` field.
-    Unmatched bets get tool = "unknown".
+    For each bet, fetch the corresponding agent's mech requests (cached) and
+    match by question title to find the tool that was used, counting bets as
+    they are matched. Returns `(totals, corrects)` keyed by tool.
+    Unmatched bets count towards tool = "unknown".
     """
-    enriched = []
-    for bet in bets:
-        agent_address = bet["bettor"]
-        mech_requests = get_mech_requests_cached(agent_address)
-        matches = match_bet_to_mech_request(bet, mech_requests)
-
-        if matches:
-            # Pick the latest mech request that was made before the bet was placed.
-            bet_ts = bet.get("timestamp", 0)
-            # print("Matched bet to mech requests, bet timestamp:", bet_ts)
-
-            before_bet = [
-                r for r in matches if int(r.get("blockTimestamp") or 0) <= bet_ts
-            ]
-            chosen = (
-                max(before_bet, key=lambda r: int(r.get("blockTimestamp") or 0))
-                if before_bet
-                else matches[0]
-            )
-            # print("Chosen mech request timestamp:", chosen.get("blockTimestamp"))
-            tool = (chosen.get("parsedRequest") or {}).get("tool") or "unknown"
-        else:
-            tool = "unknown"
-
-        enriched.append({**bet, "tool": tool})
-    return enriched
+    # Only mech requests from shortly before the oldest bet can match any bet
+    timestamp_gt = mech_window_start(
+        min((bet["timestamp"] for bet in bets), default=None)
+    )
+    prefetch_mech_requests({bet["bettor"] for bet in bets}, timestamp_gt)
 
+    # Group bets by agent so each agent's title index is built once and all of
+    # its bets are matched against it back to back
+    bets_by_agent: dict[str, list[dict]] = defaultdict(list)
+    for bet in bets:
+        bets_by_agent[bet["bettor"]].append(bet)
 
-def compute_tool_accuracy(enriched_bets: list[dict]) -> list[dict]:
+    totals: Counter = Counter()
+    corrects: Counter = Counter()
+    for agent_address, agent_bets in bets_by_agent.items():
+        title_index = build_title_index(
+            get_mech_requests_cached(agent_address, timestamp_gt)
+        )
+        for bet in agent_bets:
+            matches = match_bet_to_mech_request(bet, title_index)
+
+            if matches:
+                # Pick the latest mech request that was made before the bet was placed.
+                bet_ts = bet.get("timestamp", 0)
+                # print("Matched bet to mech requests, bet timestamp:", bet_ts)
+
+                # Requests are fetched newest first, so the first one at or
+                # before the bet is the latest
+                chosen = next(
+                    (r for r in matches if int(r.get("blockTimestamp") or 0) <= bet_ts),
+                    matches[0],
+                )
+                # print("Chosen mech request timestamp:", chosen.get("blockTimestamp"))
+                tool = (chosen.get("parsedRequest") or {}).get("tool") or "unknown"
+            else:
+                tool = "unknown"
+
+            totals[tool] += 1
+            corrects[tool] += bet["is_correct"]
+    return totals, corrects
+
+
+def compute_tool_accuracy(totals: Counter, corrects: Counter) -> list[dict]:
     """
-    Groups enriched bets by tool and computes accuracy statistics for each.
+    Computes accuracy statistics for each tool from per-tool bet counts.
     Returns a list of dicts sorted by total bets descending.
     """
-    totals: dict[str, int] = defaultdict(int)
-    corrects: dict[str, int] = defaultdict(int)
-
-    for bet in enriched_bets:
-        tool = bet["tool"]
-        totals[tool] += 1
-        if bet["is_correct"]:
-            corrects[tool] += 1
-
     stats = []
     for tool, total in totals.items():
         correct = corrects[tool]
@@ -373,11 +727,11 @@ def main(n: int = 100) -> None:
         f"Fetched {len(bets)} bets from {unique_agents} unique agents. Enriching with mech tool data..."
     )
 
-    enriched = enrich_bets_with_tool(bets)
-    print(f"Enriched {len(enriched)} bets. Computing statistics...")
+    totals, corrects = enrich_and_count(bets)
+    print(f"Enriched {len(bets)} bets. Computing statistics...")
 
-    stats = compute_tool_accuracy(enriched)
-    print_stats(stats, total_bets=len(enriched))
+    stats = compute_tool_accuracy(totals, corrects)
+    print_stats(stats, total_bets=len(bets))
 
 
 if __name__ == "__main__":
@@ -13,20 +13,29 @@ Usage:
     python tool_accuracy_timeline.py --start 2025-12-01     # from date to now
 
 Cache:
-    .tool_accuracy_timeline_cache.json (next to this script, TTL 1 hour)
+    .tool_accuracy_timeline_cache.sqlite (next to this script, TTL 12 hours)
     Mech request entries store 'fetched_from' so a wider historical window
     correctly triggers a re-fetch rather than using stale partial data.
 """
 
 import argparse
 import json
+import sqlite3
 import sys
+import threading
 import time
-from collections import defaultdict
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from operator import attrgetter
 from pathlib import Path
+from typing import Callable
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError, Timeout
 
 try:
@@ -37,6 +46,27 @@ try:
 except ImportError:
     _HAS_MATPLOTLIB = False
 
+try:
+    import orjson
+
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
+
+try:
+    import ijson
+
+    _HAS_IJSON = True
+except ImportError:
+    _HAS_IJSON = False
+
+try:
+    import numpy as np
+
+    _HAS_NUMPY = True
+except ImportError:
+    _HAS_NUMPY = False
+
 # ---------------------------------------------------------------------------
 # Constants
 # ---------------------------------------------------------------------------
@@ -51,7 +81,10 @@ QUESTION_DATA_SEPARATOR = "\u241f"
 CACHE_TTL_SECONDS = 12 * 60 * 60  # 12 hours
 
 # Disk cache file – different name to avoid clashing with tool_accuracy.py's cache
-_CACHE_FILE = Path(__file__).parent / ".tool_accuracy_timeline_cache.json"
+_CACHE_DB = Path(__file__).parent / ".tool_accuracy_timeline_cache.sqlite"
+
+# Mech titles are bucketed by this many leading characters for matching
+TITLE_KEY_LEN = 40
 
 # Minimum bets per bin per tool before it is included in the chart
 MIN_BETS_FOR_LINE = 2
@@ -60,6 +93,14 @@ MIN_BETS_FOR_LINE = 2
 REQUEST_TIMEOUT = 90  # seconds per request
 MAX_RETRIES = 4  # total attempts (1 original + 3 retries)
 RETRY_BACKOFF_BASE = 3  # seconds; doubles each attempt
+MECH_FETCH_WORKERS = 10  # concurrent per-agent mech request fetches
+PAGES_PER_REQUEST = 5  # aliased pages per POST once a window needs paginating
+MECH_AGENTS_PER_REQUEST = 10  # aliased senders per mech POST
+NO_UPPER_BOUND = 2**31 - 1  # largest GraphQL Int; "up to now" for blockTimestamp_lt
+
+# One pooled session shared by all workers so TCP/TLS connections are reused
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_maxsize=MECH_FETCH_WORKERS))
 
 
 # ---------------------------------------------------------------------------
@@ -70,13 +111,13 @@ RETRY_BACKOFF_BASE = 3  # seconds; doubles each attempt
 def _post_with_retry(url: str, **kwargs) -> requests.Response:
     """
     POST with automatic retry and exponential backoff on timeout/connection errors.
-    kwargs are forwarded to requests.post; 'timeout' defaults to REQUEST_TIMEOUT.
+    kwargs are forwarded to _session.post; 'timeout' defaults to REQUEST_TIMEOUT.
     """
     kwargs.setdefault("timeout", REQUEST_TIMEOUT)
     last_exc: Exception | None = None
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            resp = requests.post(url, **kwargs)
+            resp = _session.post(url, **kwargs)
             resp.raise_for_status()
             return resp
         except (Timeout, ConnectionError) as exc:
@@ -91,53 +132,140 @@ def _post_with_retry(url: str, **kwargs) -> requests.Response:
     raise last_exc  # type: ignore[misc]
 
 
-def _load_cache() -> dict:
-    """Load cache from disk. Returns empty dict on missing/corrupt file."""
-    if _CACHE_FILE.exists():
-        try:
-            return json.loads(_CACHE_FILE.read_text())
-        except (json.JSONDecodeError, OSError):
-            return {}
-    return {}
+# One row per entry, written as soon as it is fetched. Keys:
+#   "mech:{agent_address}"      fetched_from = earliest timestamp fetched
+#   "bets:{start_ts}:{end_ts}"  fetched_from = NULL
+# Each thread gets its own connection, so fetch workers never wait on a Python
+# lock: WAL lets readers run alongside the (brief, per-row) writes.
+_cache_local = threading.local()
+
+
+def _get_cache() -> sqlite3.Connection:
+    """Open (once per thread) the on-disk cache."""
+    conn = getattr(_cache_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(_CACHE_DB, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            "k TEXT PRIMARY KEY, fetched_at INTEGER, fetched_from INTEGER, "
+            "payload BLOB)"
+        )
+        _cache_local.conn = conn
+    return conn
 
 
-def _save_cache(cache: dict) -> None:
-    """Persist cache dict to disk."""
-    _CACHE_FILE.write_text(json.dumps(cache))
+def _load_cache_entry(key: str) -> dict | None:
+    """Returns {"fetched_at", "fetched_from", "payload"} or None if not cached."""
+    row = (
+        _get_cache()
+        .execute("SELECT fetched_at, fetched_from, payload FROM kv WHERE k = ?", (key,))
+        .fetchone()
+    )
+    if row is None:
+        return None
+    fetched_at, fetched_from, payload = row
+    return {
+        "fetched_at": fetched_at,
+        "fetched_from": fetched_from,
+        "payload": orjson.loads(payload) if _HAS_ORJSON else json.loads(payload),
+    }
 
 
-# In-memory cache loaded from disk at startup.
-# Structure:
-#   "mech:{agent_address}": {
-#       "fetched_at":   <unix ts>,
-#       "fetched_from": <unix ts>,   # earliest timestamp fetched
-#       "requests": [...]
-#   }
-#   "bets:{start_ts}:{end_ts}": {
-#       "fetched_at": <unix ts>,
-#       "bets": [...]
-#   }
-_cache: dict = _load_cache()
+def _save_cache_entry(
+    key: str,
+    payload: list,
+    fetched_from: int | None = None,
+    fetched_at: int | None = None,
+) -> None:
+    """Write one entry; `fetched_at` defaults to now."""
+    if fetched_at is None:
+        fetched_at = int(time.time())
+    blob = orjson.dumps(payload) if _HAS_ORJSON else json.dumps(payload).encode()
+    _get_cache().execute(
+        "INSERT OR REPLACE INTO kv (k, fetched_at, fetched_from, payload) "
+        "VALUES (?, ?, ?, ?)",
+        (key, fetched_at, fetched_from, blob),
+    )
 
 
 # ---------------------------------------------------------------------------
 # GraphQL queries
 # ---------------------------------------------------------------------------
 
-GET_MECH_SENDER_QUERY = """
-query MechSender($id: ID!, $timestamp_gt: Int!, $skip: Int, $first: Int) {
-    sender(id: $id) {
-        totalMarketplaceRequests
-        requests(first: $first, skip: $skip, where: { blockTimestamp_gt: $timestamp_gt }) {
+# Only the fields the matching and binning read: prompts are large and unused
+MECH_REQUEST_FIELDS = """
             blockTimestamp
             parsedRequest {
                 questionTitle
                 tool
-                prompt
-            }
+            }"""
+
+BET_FIELDS = """
+        timestamp
+        bettor {
+          id
         }
-    }
-}
+        outcomeIndex
+        fixedProductMarketMaker {
+          currentAnswer
+          question
+        }"""
+
+
+def _mech_sender_query(pages: int) -> str:
+    """
+    Query for `pages` consecutive pages of one sender's requests in
+    [`$timestamp_gte`, `$timestamp_lt`), oldest first, aliased p0 .. p{pages-1},
+    each with its own `$skip{i}` variable.
+    """
+    skip_defs = "".join(f", $skip{i}: Int" for i in range(pages))
+    selections = "".join(f"""
+        p{i}: requests(
+            first: $first
+            skip: $skip{i}
+            orderBy: blockTimestamp
+            orderDirection: asc
+            where: {{
+                blockTimestamp_gte: $timestamp_gte
+                blockTimestamp_lt: $timestamp_lt
+            }}
+        ) {{{MECH_REQUEST_FIELDS}
+        }}""" for i in range(pages))
+    return f"""
+query MechSender(
+    $id: ID!, $timestamp_gte: Int!, $timestamp_lt: Int!, $first: Int{skip_defs}
+) {{
+    sender(id: $id) {{{selections}
+    }}
+}}
+"""
+
+
+def _bets_query(pages: int) -> str:
+    """
+    Query for `pages` consecutive pages of resolved bets in [`$cursor`, `$end`],
+    oldest first, aliased bets_0 .. bets_{pages-1}. Only the variables change
+    between rounds, so the subgraph sees at most two distinct query strings.
+    """
+    skip_defs = "".join(f", $skip{i}: Int" for i in range(pages))
+    selections = "".join(f"""
+    bets_{i}: bets(
+        first: $first
+        skip: $skip{i}
+        orderBy: timestamp
+        orderDirection: asc
+        where: {{
+            timestamp_gte: $cursor
+            timestamp_lte: $end
+            fixedProductMarketMaker_: {{ currentAnswer_not: null }}
+        }}
+    ) {{{BET_FIELDS}
+    }}""" for i in range(pages))
+    return f"""
+query Bets($cursor: BigInt!, $end: BigInt!, $first: Int{skip_defs}) {{{selections}
+}}
 """
 
 
@@ -146,98 +274,157 @@ query MechSender($id: ID!, $timestamp_gt: Int!, $skip: Int, $first: Int) {
 # ---------------------------------------------------------------------------
 
 
+def _advance_cursor(collected: list, round_items: list, ts_of: Callable) -> int:
+    """
+    Add a full round of timestamp-ascending items to `collected` and return the
+    `_gte` cursor for the next round.
+
+    The next round restarts at the last timestamp seen, so items at that
+    timestamp are held back here and picked up again by the next round;
+    otherwise ties split across the boundary would be duplicated or lost.
+    """
+    last_ts = ts_of(round_items[-1])
+    keep = len(round_items)
+    while keep and ts_of(round_items[keep - 1]) == last_ts:
+        keep -= 1
+    if keep == 0:
+        # The whole round shares one timestamp; step past it
+        collected.extend(round_items)
+        return last_ts + 1
+    collected.extend(round_items[:keep])
+    return last_ts
+
+
+@dataclass(slots=True)
+class Bet:
+    """A resolved bet. Stored on disk as a plain dict (see `asdict`)."""
+
+    timestamp: int
+    bettor: str
+    chosen_outcome: int
+    correct_outcome: int
+    is_correct: bool
+    question: str
+    norm_title: str = ""
+    tool: str = "unknown"
+
+
+def _format_bet(bet: dict) -> Bet:
+    chosen = int(bet["outcomeIndex"])
+    correct = int(bet["fixedProductMarketMaker"]["currentAnswer"], 16)
+    return Bet(
+        timestamp=int(bet["timestamp"]),
+        bettor=bet["bettor"]["id"],
+        chosen_outcome=chosen,
+        correct_outcome=correct,
+        is_correct=chosen == correct,
+        question=bet["fixedProductMarketMaker"]["question"],
+        norm_title=extract_question_title(
+            bet["fixedProductMarketMaker"]["question"]
+        ).strip(),
+    )
+
+
+def _read_bet_pages(response: requests.Response) -> dict[str, list[Bet]]:
+    """
+    Map each `bets_{i}` alias in a bets response to its page of formatted bets.
+    With ijson the body is streamed one page at a time, so the raw JSON of the
+    whole response is never held alongside the formatted bets. A missing
+    `data` or a null page (partial-error response) raises RuntimeError.
+    """
+    if _HAS_IJSON:
+        response.raw.decode_content = True
+        with response:
+            pages = {}
+            for alias, batch in ijson.kvitems(response.raw, "data"):
+                if batch is None:
+                    raise RuntimeError(f"Subgraph error (bets): {alias} is null")
+                pages[alias] = [_format_bet(bet) for bet in batch]
+        if not pages:
+            raise RuntimeError("Subgraph error (bets): response has no data")
+        return pages
+    data = orjson.loads(response.content) if _HAS_ORJSON else response.json()
+    if not data.get("data") or None in data["data"].values():
+        errors = data.get("errors", data)
+        raise RuntimeError(f"Subgraph error (bets): {errors}")
+    return {
+        alias: [_format_bet(bet) for bet in batch]
+        for alias, batch in data["data"].items()
+    }
+
+
 def _fetch_bets_from_api(
-    start_ts: int, end_ts: int, batch_size: int = 1000
-) -> list[dict]:
+    start_ts: int,
+    end_ts: int,
+    batch_size: int = 1000,
+    on_bets: Callable[[list[Bet]], None] | None = None,
+) -> list[Bet]:
     """
     Fetch all resolved bets within [start_ts, end_ts] from the subgraph.
-    Paginates automatically.
+    Paginates automatically on a timestamp cursor, so `skip` never grows past
+    one request's worth of pages. `on_bets` is called with each round of bets
+    as it arrives.
     """
     headers = {"Content-Type": "application/json"}
-    all_raw_bets: list[dict] = []
-    skip = 0
+    all_bets: list[Bet] = []
+    cursor = start_ts
+    # One page first; if the window is bigger, fetch several aliased pages per POST
+    pages = 1
 
     while True:
-        query = f"""
-    {{
-      bets(
-        first: {batch_size}
-        skip: {skip}
-        orderBy: timestamp
-        orderDirection: asc
-        where: {{
-          timestamp_gte: {start_ts}
-          timestamp_lte: {end_ts}
-          fixedProductMarketMaker_: {{currentAnswer_not: null}}
-        }}
-      ) {{
-        id
-        timestamp
-        bettor {{
-          id
-          serviceId
-        }}
-        outcomeIndex
-        fixedProductMarketMaker {{
-          currentAnswer
-          question
-        }}
-      }}
-    }}
-    """
+        variables = {"cursor": str(cursor), "end": str(end_ts), "first": batch_size}
+        variables.update({f"skip{i}": i * batch_size for i in range(pages)})
         response = _post_with_retry(
-            PREDICT_OMEN_URL, headers=headers, json={"query": query}
+            PREDICT_OMEN_URL,
+            headers=headers,
+            json={"query": _bets_query(pages), "variables": variables},
+            stream=_HAS_IJSON,
         )
-        data = response.json()
-        if "data" not in data:
-            errors = data.get("errors", data)
-            raise RuntimeError(f"Subgraph error (bets): {errors}")
-        batch = data["data"]["bets"]
-        if not batch:
-            break
-        all_raw_bets.extend(batch)
-        if len(batch) < batch_size:
+        bet_pages = _read_bet_pages(response)
+        round_bets: list[Bet] = []
+        done = False
+        for i in range(pages):
+            batch = bet_pages[f"bets_{i}"]
+            round_bets.extend(batch)
+            if len(batch) < batch_size:
+                done = True
+                break
+        if on_bets is not None:
+            on_bets(round_bets)
+        if done:
+            all_bets.extend(round_bets)
             break
-        skip += batch_size
-
-    formatted = []
-    for bet in all_raw_bets:
-        chosen = int(bet["outcomeIndex"])
-        correct = int(bet["fixedProductMarketMaker"]["currentAnswer"], 16)
-        formatted.append(
-            {
-                "bet_id": bet["id"],
-                "timestamp": int(bet["timestamp"]),
-                "bettor": bet["bettor"]["id"],
-                "service_id": bet["bettor"]["serviceId"],
-                "chosen_outcome": chosen,
-                "correct_outcome": correct,
-                "is_correct": chosen == correct,
-                "question": bet["fixedProductMarketMaker"]["question"],
-            }
-        )
-    return formatted
+        cursor = _advance_cursor(all_bets, round_bets, attrgetter("timestamp"))
+        pages = PAGES_PER_REQUEST
+    return all_bets
 
 
-def fetch_bets_in_range(start_ts: int, end_ts: int) -> list[dict]:
+def fetch_bets_in_range(
+    start_ts: int,
+    end_ts: int,
+    on_bets: Callable[[list[Bet]], None] | None = None,
+) -> list[Bet]:
     """
     Returns resolved bets in [start_ts, end_ts], using a disk-backed cache.
-    Re-fetches if the cache entry is missing or older than CACHE_TTL_SECONDS.
+    Re-fetches if the cache entry is missing or older than CACHE_TTL_SECONDS,
+    calling `on_bets` with each round of freshly fetched bets.
     """
     key = f"bets:{start_ts}:{end_ts}"
-    entry = _cache.get(key)
+    entry = _load_cache_entry(key)
     if entry is None or (time.time() - entry["fetched_at"]) > CACHE_TTL_SECONDS:
         print(
             f"  Fetching bets from subgraph ({_ts_to_date(start_ts)} → {_ts_to_date(end_ts)})..."
         )
-        bets = _fetch_bets_from_api(start_ts, end_ts)
-        _cache[key] = {"fetched_at": int(time.time()), "bets": bets}
-        _save_cache(_cache)
-    else:
-        print(
-            f"  Using cached bets (fetched {_seconds_ago(_cache[key]['fetched_at'])} ago)."
-        )
-    return _cache[key]["bets"]
+        bets = _fetch_bets_from_api(start_ts, end_ts, on_bets=on_bets)
+        _save_cache_entry(key, [asdict(bet) for bet in bets])
+        return bets
+    print(f"  Using cached bets (fetched {_seconds_ago(entry['fetched_at'])} ago).")
+    bets = [Bet(**bet) for bet in entry["payload"]]
+    # Entries cached before `norm_title` existed are normalized here
+    for bet in bets:
+        if not bet.norm_title:
+            bet.norm_title = extract_question_title(bet.question).strip()
+    return bets
 
 
 # ---------------------------------------------------------------------------
@@ -245,66 +432,243 @@ def fetch_bets_in_range(start_ts: int, end_ts: int) -> list[dict]:
 # ---------------------------------------------------------------------------
 
 
+def _request_ts(mech_request: dict) -> int:
+    return int(mech_request["blockTimestamp"])
+
+
+def _mech_senders_query(n_ranges: int) -> str:
+    """
+    Query for the first page of requests of `n_ranges` senders, aliased
+    a0 .. a{n-1}. Alias i reads sender `$id{i}` in [`$gte{i}`, `$lt{i}`).
+    """
+    var_defs = "".join(
+        f", $id{i}: ID!, $gte{i}: Int!, $lt{i}: Int!" for i in range(n_ranges)
+    )
+    selections = "".join(f"""
+    a{i}: sender(id: $id{i}) {{
+        requests(
+            first: $first
+            orderBy: blockTimestamp
+            orderDirection: asc
+            where: {{ blockTimestamp_gte: $gte{i}, blockTimestamp_lt: $lt{i} }}
+        ) {{{MECH_REQUEST_FIELDS}
+        }}
+    }}""" for i in range(n_ranges))
+    return f"""
+query MechSenders($first: Int{var_defs}) {{{selections}
+}}
+"""
+
+
+def _fetch_mech_requests_for_agents(
+    ranges: list[tuple[str, int, int]], batch_size: int = 1000
+) -> list[list[dict]]:
+    """
+    Fetch the mech requests of several (agent, timestamp_gt, timestamp_lt)
+    ranges with one aliased query. Ranges whose first page is full are paged
+    further individually. Returns the requests of each range, in order.
+    """
+    variables: dict = {"first": batch_size}
+    for i, (agent, timestamp_gt, timestamp_lt) in enumerate(ranges):
+        variables[f"id{i}"] = agent
+        variables[f"gte{i}"] = timestamp_gt + 1
+        variables[f"lt{i}"] = timestamp_lt
+    response = _post_with_retry(
+        OLAS_MECH_SUBGRAPH_URL,
+        json={"query": _mech_senders_query(len(ranges)), "variables": variables},
+        headers={"Content-Type": "application/json"},
+    )
+    data = orjson.loads(response.content) if _HAS_ORJSON else response.json()
+    if "errors" in data or "data" not in data:
+        raise RuntimeError(f"Subgraph error (mech): {data.get('errors', data)}")
+    data = data.get("data") or {}
+
+    results = []
+    for i, (agent, _, timestamp_lt) in enumerate(ranges):
+        batch = (data.get(f"a{i}") or {}).get("requests", [])
+        if len(batch) < batch_size:
+            results.append(batch)
+            continue
+        range_requests: list[dict] = []
+        cursor = _advance_cursor(range_requests, batch, _request_ts)
+        results.append(
+            range_requests
+            + _fetch_all_mech_requests_from_api(
+                agent, cursor - 1, batch_size, timestamp_lt=timestamp_lt
+            )
+        )
+    return results
+
+
 def _fetch_all_mech_requests_from_api(
-    agent_address: str, timestamp_gt: int, batch_size: int = 1000
+    agent_address: str,
+    timestamp_gt: int,
+    batch_size: int = 1000,
+    timestamp_lt: int = NO_UPPER_BOUND,
 ) -> list[dict]:
     """
-    Fetch ALL mech requests for an agent since timestamp_gt, paginating fully.
+    Fetch ALL mech requests for an agent in (timestamp_gt, timestamp_lt),
+    paginating fully.
     """
-    all_requests = []
-    skip = 0
+    all_requests: list[dict] = []
+    cursor = timestamp_gt + 1
+    # One page first; if the agent has more, fetch several aliased pages per POST
+    pages = 1
     while True:
         variables = {
             "id": agent_address,
-            "timestamp_gt": timestamp_gt,
-            "skip": skip,
+            "timestamp_gte": cursor,
+            "timestamp_lt": timestamp_lt,
             "first": batch_size,
         }
+        variables.update({f"skip{i}": i * batch_size for i in range(pages)})
         response = _post_with_retry(
             OLAS_MECH_SUBGRAPH_URL,
-            json={"query": GET_MECH_SENDER_QUERY, "variables": variables},
+            json={"query": _mech_sender_query(pages), "variables": variables},
             headers={"Content-Type": "application/json"},
         )
-        data = response.json()
-        if "data" not in data:
-            raise RuntimeError(f"Subgraph error (mech): {data}")
+        data = orjson.loads(response.content) if _HAS_ORJSON else response.json()
+        if "errors" in data or "data" not in data:
+            raise RuntimeError(f"Subgraph error (mech): {data.get('errors', data)}")
         result = (data.get("data") or {}).get("sender") or {}
-        batch = result.get("requests", [])
-        if not batch:
-            break
-        all_requests.extend(batch)
-        if len(batch) < batch_size:
+        round_requests: list[dict] = []
+        done = False
+        for i in range(pages):
+            batch = result.get(f"p{i}", [])
+            round_requests.extend(batch)
+            if len(batch) < batch_size:
+                done = True
+                break
+        if done:
+            all_requests.extend(round_requests)
             break
-        skip += batch_size
+        cursor = _advance_cursor(all_requests, round_requests, _request_ts)
+        pages = PAGES_PER_REQUEST
     return all_requests
 
 
-def get_mech_requests_cached(agent_address: str, start_ts: int) -> list[dict]:
+# (cached requests still valid, (timestamp_gt, timestamp_lt) ranges to fetch,
+#  fetched_from and fetched_at to record once they are merged in; fetched_at
+#  None means now)
+MechCachePlan = tuple[list[dict], list[tuple[int, int]], int, int | None]
+
+
+def load_cached_mech_requests(agent_address: str, start_ts: int) -> MechCachePlan:
+    """
+    Work out what is missing from the cached mech requests of the given agent
+    for a window starting at start_ts. The cache is fresh when no ranges are
+    returned.
+
+    - No cached entry: fetch everything since start_ts.
+    - Window wider than fetched_from: fetch only (start_ts, fetched_from].
+      Nothing newer is fetched then, so the entry keeps its old fetched_at
+      and still expires on schedule.
+    - Entry older than CACHE_TTL_SECONDS: fetch only from the newest cached
+      timestamp onwards. Cached requests at that timestamp are dropped and
+      fetched again, so requests landing in the same second are not missed.
+    """
+    entry = _load_cache_entry(f"mech:{agent_address}")
+    if entry is None:
+        return [], [(start_ts, NO_UPPER_BOUND)], start_ts, None
+
+    cached = entry["payload"]
+    fetched_from = entry["fetched_from"]
+    fetched_at = entry["fetched_at"]
+    ranges = []
+    if start_ts < fetched_from:  # wider window
+        ranges.append((start_ts, fetched_from + 1))
+    if (time.time() - fetched_at) > CACHE_TTL_SECONDS:
+        fetched_at = None
+        latest = max((int(r["blockTimestamp"]) for r in cached), default=fetched_from)
+        cached = [r for r in cached if int(r["blockTimestamp"]) < latest]
+        ranges.append((max(latest, fetched_from + 1) - 1, NO_UPPER_BOUND))
+    return cached, ranges, min(start_ts, fetched_from), fetched_at
+
+
+def fetch_and_cache_mech_requests(
+    plans: dict[str, MechCachePlan],
+) -> dict[str, list[dict]]:
     """
-    Returns mech requests for the given agent since start_ts, using a disk-backed cache.
+    Fetch the missing ranges of a batch of agents, merge them into their
+    cached requests and cache the result.
+    """
+    ranges = [
+        (agent, timestamp_gt, timestamp_lt)
+        for agent, (_, missing, _, _) in plans.items()
+        for timestamp_gt, timestamp_lt in missing
+    ]
+    merged = {agent: list(cached) for agent, (cached, _, _, _) in plans.items()}
+    for (agent, _, _), reqs in zip(ranges, _fetch_mech_requests_for_agents(ranges)):
+        merged[agent].extend(reqs)
+
+    for agent, reqs in merged.items():
+        add_normalized_titles(reqs)
+        reqs.sort(key=lambda r: int(r["blockTimestamp"]))
+        _, _, fetched_from, fetched_at = plans[agent]
+        _save_cache_entry(
+            f"mech:{agent}", reqs, fetched_from=fetched_from, fetched_at=fetched_at
+        )
+    return merged
 
-    Invalidation rules:
-    - Re-fetch if no cached entry.
-    - Re-fetch if the requested start_ts is earlier than what was previously fetched
-      (the window has grown wider — cached data is incomplete).
-    - Re-fetch if the entry is older than CACHE_TTL_SECONDS.
+
+class MechRequestFetcher:
     """
-    key = f"mech:{agent_address}"
-    entry = _cache.get(key)
-    needs_refresh = (
-        entry is None
-        or start_ts < entry.get("fetched_from", start_ts + 1)  # wider window
-        or (time.time() - entry["fetched_at"]) > CACHE_TTL_SECONDS
-    )
-    if needs_refresh:
-        reqs = _fetch_all_mech_requests_from_api(agent_address, timestamp_gt=start_ts)
-        _cache[key] = {
-            "fetched_at": int(time.time()),
-            "fetched_from": start_ts,
-            "requests": reqs,
-        }
-        _save_cache(_cache)
-    return _cache[key]["requests"]
+    Fetches agents' mech requests on a thread pool as soon as their bets are
+    seen, so cache misses are fetched while bet pagination is still running.
+    """
+
+    def __init__(self, start_ts: int) -> None:
+        self.start_ts = start_ts
+        self._executor = ThreadPoolExecutor(max_workers=MECH_FETCH_WORKERS)
+        self._futures: dict = {}
+        self._seen: set[str] = set()
+        self._agent_requests: dict[str, list[dict]] = {}
+        self._n_stale = 0
+
+    def add_bets(self, bets: list[Bet]) -> None:
+        """Serve new agents from the cache or schedule fetches for them."""
+        new_agents = {bet.bettor for bet in bets} - self._seen
+        self._seen.update(new_agents)
+        stale: list[tuple[str, MechCachePlan]] = []
+        for agent in new_agents:
+            plan = load_cached_mech_requests(agent, self.start_ts)
+            if plan[1]:
+                stale.append((agent, plan))
+            else:
+                self._agent_requests[agent] = plan[0]
+        self._n_stale += len(stale)
+
+        # Cache misses are fetched MECH_AGENTS_PER_REQUEST agents per POST
+        for start in range(0, len(stale), MECH_AGENTS_PER_REQUEST):
+            end = start + MECH_AGENTS_PER_REQUEST
+            chunk = dict(stale[start:end])
+            future = self._executor.submit(fetch_and_cache_mech_requests, chunk)
+            self._futures[future] = list(chunk)
+
+    def results(self) -> tuple[dict[str, list[dict]], set[str]]:
+        """
+        Wait for every scheduled fetch. Returns ({agent: requests}, failed agents);
+        failed agents map to an empty list.
+        """
+        n_cached = len(self._agent_requests)
+        if n_cached:
+            print(f"    {n_cached} agent(s) served from cache.")
+        failed_agents: set[str] = set()
+        done = 0
+        with self._executor:
+            for future in as_completed(self._futures):
+                chunk = self._futures[future]
+                done += len(chunk)
+                print(f"    Agent {done}/{self._n_stale}...")
+                try:
+                    self._agent_requests.update(future.result())
+                except Exception as exc:
+                    print(
+                        f"    [warn] Failed to fetch mech requests for {len(chunk)} agent(s): {exc}. Skipping."
+                    )
+                    failed_agents.update(chunk)
+                    self._agent_requests.update((agent, []) for agent in chunk)
+        return self._agent_requests, failed_agents
 
 
 # ---------------------------------------------------------------------------
@@ -312,30 +676,113 @@ def get_mech_requests_cached(agent_address: str, start_ts: int) -> list[dict]:
 # ---------------------------------------------------------------------------
 
 
+# Many agents bet on the same markets, so bet titles repeat heavily
+@lru_cache(maxsize=100_000)
 def extract_question_title(question: str) -> str:
     if not question:
         return ""
     return question.split(QUESTION_DATA_SEPARATOR)[0]
 
 
-def match_bet_to_mech_request(bet: dict, mech_requests: list[dict]) -> list[dict]:
+def normalize_mech_title(req: dict) -> str:
+    """Question title of a mech request with the data suffix and whitespace removed."""
+    return extract_question_title(
+        (req.get("parsedRequest") or {}).get("questionTitle", "")
+    ).strip()
+
+
+def add_normalized_titles(mech_requests: list[dict]) -> list[dict]:
+    """
+    Store each request's normalized title under `_norm_title` so it is computed
+    once per fetch and persisted with the disk cache.
+    """
+    for req in mech_requests:
+        if "_norm_title" not in req:
+            req["_norm_title"] = normalize_mech_title(req)
+    return mech_requests
+
+
+# Title index for one agent's mech requests, sorted by blockTimestamp:
+#   ({first TITLE_KEY_LEN chars: [(position, title), ...]},
+#    [(position, title), ...] for titles shorter than TITLE_KEY_LEN,
+#    [(position, title), ...] for every titled request,
+#    requests, blockTimestamp of each request)
+TitleIndex = tuple[
+    dict[str, list[tuple[int, str]]],
+    list[tuple[int, str]],
+    list[tuple[int, str]],
+    list[dict],
+    list[int],
+]
+
+
+def build_title_index(mech_requests: list[dict]) -> TitleIndex:
+    """Bucket an agent's mech requests by the first TITLE_KEY_LEN title chars."""
+    timestamped = sorted(
+        ((int(req.get("blockTimestamp") or 0), req) for req in mech_requests),
+        key=lambda item: item[0],
+    )
+    timestamps = [ts for ts, _ in timestamped]
+    requests_sorted = [req for _, req in timestamped]
+
+    buckets: dict[str, list[tuple[int, str]]] = defaultdict(list)
+    short: list[tuple[int, str]] = []
+    entries: list[tuple[int, str]] = []
+    for position, req in enumerate(requests_sorted):
+        # Entries cached before `_norm_title` existed are normalized here
+        mech_title = req.get("_norm_title")
+        if mech_title is None:
+            mech_title = normalize_mech_title(req)
+        if not mech_title:
+            continue
+        entry = (position, mech_title)
+        entries.append(entry)
+        if len(mech_title) < TITLE_KEY_LEN:
+            short.append(entry)
+        else:
+            buckets[mech_title[:TITLE_KEY_LEN]].append(entry)
+    return buckets, short, entries, requests_sorted, timestamps
+
+
+def match_bet_to_mech_request(bet: Bet, title_index: TitleIndex) -> list[int]:
     """
     Match a bet to mech requests by question title prefix.
     The mech subgraph may truncate the title, so we accept prefix matches.
+    Returns the matching positions in the index, oldest request first.
+
+    When both titles are at least TITLE_KEY_LEN long, a prefix match implies
+    they share the same bucket key, so only that bucket and the short titles
+    need checking. Short bet titles fall back to checking every request.
     """
-    bet_title = extract_question_title(bet.get("question", "")).strip()
+    bet_title = bet.norm_title
     if not bet_title:
         return []
-    matched = []
-    for req in mech_requests:
-        mech_title = extract_question_title(
-            (req.get("parsedRequest") or {}).get("questionTitle", "")
-        ).strip()
-        if not mech_title:
-            continue
-        if bet_title.startswith(mech_title) or mech_title.startswith(bet_title):
-            matched.append(req)
-    return matched
+    buckets, short, entries, _, _ = title_index
+    if len(bet_title) < TITLE_KEY_LEN:
+        candidates = entries
+    else:
+        candidates = buckets.get(bet_title[:TITLE_KEY_LEN], []) + short
+    return sorted(
+        position
+        for position, mech_title in candidates
+        if bet_title.startswith(mech_title) or mech_title.startswith(bet_title)
+    )
+
+
+def choose_mech_request(
+    positions: list[int], title_index: TitleIndex, bet_ts: int
+) -> dict:
+    """
+    The latest matched request made at or before `bet_ts` (the earliest one
+    if every match came after the bet).
+    """
+    _, _, _, requests_sorted, timestamps = title_index
+    matched_ts = [timestamps[position] for position in positions]
+    i = bisect_right(matched_ts, bet_ts) - 1
+    if i < 0:
+        return requests_sorted[positions[0]]
+    # First of any requests tied at that timestamp
+    return requests_sorted[positions[bisect_left(matched_ts, matched_ts[i])]]
 
 
 # ---------------------------------------------------------------------------
@@ -343,55 +790,35 @@ def match_bet_to_mech_request(bet: dict, mech_requests: list[dict]) -> list[dict
 # ---------------------------------------------------------------------------
 
 
-def enrich_bets_with_tool(bets: list[dict], start_ts: int) -> list[dict]:
+def enrich_bets_with_tool(bets: list[Bet], fetcher: MechRequestFetcher) -> list[Bet]:
     """
-    For each bet, fetch the agent's mech requests (cached) covering start_ts,
-    match by question title, and attach the 'tool' field.
-    Unmatched bets get tool = 'unknown'.
+    For each bet, get the agent's mech requests from `fetcher` (cached, or
+    already being fetched), match by question title, and set its `tool` in
+    place. Unmatched bets keep tool = 'unknown'.
     """
-    # Group bets by agent to minimise cache lookups
-    agents = {bet["bettor"] for bet in bets}
+    # Agents whose bets came from the bets cache have not been scheduled yet
+    fetcher.add_bets(bets)
+    agents = {bet.bettor for bet in bets}
     print(f"  Fetching mech tool data for {len(agents)} unique agents...")
 
-    agent_requests: dict[str, list[dict]] = {}
-    failed_agents: set[str] = set()
-    for i, agent in enumerate(agents, 1):
-        if i % 20 == 0 or i == len(agents):
-            print(f"    Agent {i}/{len(agents)}...")
-        try:
-            agent_requests[agent] = get_mech_requests_cached(agent, start_ts)
-        except Exception as exc:
-            print(
-                f"    [warn] Failed to fetch mech requests for {agent}: {exc}. Skipping."
-            )
-            failed_agents.add(agent)
-            agent_requests[agent] = []
+    agent_requests, failed_agents = fetcher.results()
     if failed_agents:
         print(
             f"  Warning: {len(failed_agents)} agent(s) skipped due to fetch errors — their bets will be 'unknown'."
         )
 
-    enriched = []
+    title_indexes = {
+        agent: build_title_index(reqs) for agent, reqs in agent_requests.items()
+    }
+
     for bet in bets:
-        mech_requests = agent_requests[bet["bettor"]]
-        matches = match_bet_to_mech_request(bet, mech_requests)
-
-        if matches:
-            bet_ts = bet["timestamp"]
-            before_bet = [
-                r for r in matches if int(r.get("blockTimestamp") or 0) <= bet_ts
-            ]
-            chosen = (
-                max(before_bet, key=lambda r: int(r.get("blockTimestamp") or 0))
-                if before_bet
-                else matches[0]
-            )
-            tool = (chosen.get("parsedRequest") or {}).get("tool") or "unknown"
-        else:
-            tool = "unknown"
+        title_index = title_indexes[bet.bettor]
+        positions = match_bet_to_mech_request(bet, title_index)
 
-        enriched.append({**bet, "tool": tool})
-    return enriched
+        if positions:
+            chosen = choose_mech_request(positions, title_index, bet.timestamp)
+            bet.tool = (chosen.get("parsedRequest") or {}).get("tool") or "unknown"
+    return bets
 
 
 # ---------------------------------------------------------------------------
@@ -422,8 +849,66 @@ def _bin_edges(start_ts: int, end_ts: int) -> list[int]:
     return edges
 
 
+def _bin_counts(
+    enriched_bets: list[Bet], edges: list[int], tool_names: list[str]
+) -> tuple[list[list[int]], list[list[int]]]:
+    """
+    Per-bin, per-tool (total, correct) bet counts as [bin][tool_id] matrices,
+    where tool ids index into `tool_names`. Bets outside the edges are skipped.
+    """
+    n_bins = len(edges) - 1
+    tool_ids = {tool: tid for tid, tool in enumerate(tool_names)}
+    bin_totals = [[0] * len(tool_names) for _ in range(n_bins)]
+    bin_corrects = [[0] * len(tool_names) for _ in range(n_bins)]
+
+    for bet in enriched_bets:
+        # Find which bin this bet falls into via binary search
+        bin_idx = bisect_right(edges, bet.timestamp) - 1
+        if bin_idx < 0 or bin_idx >= n_bins:
+            continue
+        tid = tool_ids[bet.tool]
+        bin_totals[bin_idx][tid] += 1
+        if bet.is_correct:
+            bin_corrects[bin_idx][tid] += 1
+    return bin_totals, bin_corrects
+
+
+def _bin_counts_numpy(
+    enriched_bets: list[Bet], edges: list[int], tool_names: list[str]
+) -> tuple["np.ndarray", "np.ndarray"]:
+    """
+    Same as `_bin_counts`, with the binning and counting done by NumPy and the
+    matrices returned as (n_bins, n_tools) arrays.
+    """
+    n_bins, n_tools = len(edges) - 1, len(tool_names)
+    tool_ids = {tool: tid for tid, tool in enumerate(tool_names)}
+    n = len(enriched_bets)
+    ts = np.fromiter((bet.timestamp for bet in enriched_bets), np.int64, n)
+    tids = np.fromiter((tool_ids[bet.tool] for bet in enriched_bets), np.int64, n)
+    correct = np.fromiter((bet.is_correct for bet in enriched_bets), bool, n)
+
+    bin_idx = np.searchsorted(np.asarray(edges), ts, side="right") - 1
+    in_range = (bin_idx >= 0) & (bin_idx < n_bins)
+    # One flat (bin, tool) key per bet, so a single bincount fills the matrix
+    keys = bin_idx[in_range] * n_tools + tids[in_range]
+    size = n_bins * n_tools
+    totals = np.bincount(keys, minlength=size).reshape(n_bins, n_tools)
+    corrects = np.bincount(keys[correct[in_range]], minlength=size).reshape(
+        n_bins, n_tools
+    )
+    return totals, corrects
+
+
+def _accuracy_series(totals: list[int], corrects: list[int]) -> list[float | None]:
+    """Accuracy% per bin (None = no bets)."""
+    return [
+        round(correct / total * 100, 1) if total > 0 else None
+        for total, correct in zip(totals, corrects)
+    ]
+
+
 def bin_bets(
-    enriched_bets: list[dict], start_ts: int, end_ts: int
+    enriched_bets: list[Bet], start_ts: int, end_ts: int
 ) -> tuple[list[datetime], dict[str, list[float | None]]]:
     """
     Groups enriched bets into time bins and computes accuracy per tool per bin.
@@ -439,45 +924,30 @@ def bin_bets(
         datetime.fromtimestamp(edges[i], tz=timezone.utc) for i in range(n_bins)
     ]
 
-    # For each bin collect per-tool counters
-    bin_totals: list[dict[str, int]] = [defaultdict(int) for _ in range(n_bins)]
-    bin_corrects: list[dict[str, int]] = [defaultdict(int) for _ in range(n_bins)]
-
-    for bet in enriched_bets:
-        ts = bet["timestamp"]
-        # Find which bin this bet falls into via binary search
-        bin_idx = None
-        for i in range(n_bins):
-            if edges[i] <= ts < edges[i + 1]:
-                bin_idx = i
-                break
-        if bin_idx is None:
-            continue
-        tool = bet["tool"]
-        bin_totals[bin_idx][tool] += 1
-        if bet["is_correct"]:
-            bin_corrects[bin_idx][tool] += 1
-
-    # Collect all tools across all bins
-    all_tools: set[str] = set()
-    for bt in bin_totals:
-        all_tools.update(bt.keys())
-
-    tool_series: dict[str, list[float | None]] = {}
-    for tool in sorted(all_tools):
-        series: list[float | None] = []
-        for i in range(n_bins):
-            total = bin_totals[i].get(tool, 0)
-            correct = bin_corrects[i].get(tool, 0)
-            series.append(round(correct / total * 100, 1) if total > 0 else None)
-        tool_series[tool] = series
-
-    # Overall (excluding 'unknown')
-    overall_series: list[float | None] = []
-    for i in range(n_bins):
-        total = sum(v for k, v in bin_totals[i].items() if k != "unknown")
-        correct = sum(v for k, v in bin_corrects[i].items() if k != "unknown")
-        overall_series.append(round(correct / total * 100, 1) if total > 0 else None)
+    tool_names = sorted({bet.tool for bet in enriched_bets})
+    known = [tid for tid, tool in enumerate(tool_names) if tool != "unknown"]
+    # Per-tool and overall (excluding 'unknown') per-bin (totals, corrects)
+    if _HAS_NUMPY:
+        totals, corrects = _bin_counts_numpy(enriched_bets, edges, tool_names)
+        tool_columns = list(zip(totals.T.tolist(), corrects.T.tolist()))
+        overall_totals = totals[:, known].sum(axis=1).tolist()
+        overall_corrects = corrects[:, known].sum(axis=1).tolist()
+    else:
+        bin_totals, bin_corrects = _bin_counts(enriched_bets, edges, tool_names)
+        tool_columns = [
+            ([row[tid] for row in bin_totals], [row[tid] for row in bin_corrects])
+            for tid in range(len(tool_names))
+        ]
+        overall_totals = [sum(row[tid] for tid in known) for row in bin_totals]
+        overall_corrects = [sum(row[tid] for tid in known) for row in bin_corrects]
+
+    # Only tools with at least one bet inside the bins get a series
+    tool_series: dict[str, list[float | None]] = {
+        tool: _accuracy_series(tool_totals, tool_corrects)
+        for tool, (tool_totals, tool_corrects) in zip(tool_names, tool_columns)
+        if any(tool_totals)
+    }
+    overall_series = _accuracy_series(overall_totals, overall_corrects)
 
     return bin_labels, tool_series, overall_series
 
@@ -505,26 +975,35 @@ def plot_accuracy_timeline(
 
     fig, ax = plt.subplots(figsize=(14, 7))
 
+    # matplotlib depends on NumPy, so it is always available here. Empty bins
+    # (None) become NaN and are masked out of each line.
+    labels = np.array(bin_labels, dtype=object)
+
     plotted_any = False
     for tool, series in tool_series.items():
         if tool == "unknown":
             continue
-        non_null = [(bin_labels[i], v) for i, v in enumerate(series) if v is not None]
-        if len(non_null) < MIN_BETS_FOR_LINE:
+        values = np.array(series, dtype=np.float64)
+        mask = ~np.isnan(values)
+        if mask.sum() < MIN_BETS_FOR_LINE:
             continue
-        xs, ys = zip(*non_null)
-        ax.plot(xs, ys, marker="o", markersize=4, linewidth=1.8, label=tool)
+        ax.plot(
+            labels[mask],
+            values[mask],
+            marker="o",
+            markersize=4,
+            linewidth=1.8,
+            label=tool,
+        )
         plotted_any = True
 
     # Overall line (dashed, bold)
-    overall_points = [
-        (bin_labels[i], v) for i, v in enumerate(overall_series) if v is not None
-    ]
-    if overall_points:
-        xs, ys = zip(*overall_points)
+    overall = np.array(overall_series, dtype=np.float64)
+    mask = ~np.isnan(overall)
+    if mask.any():
         ax.plot(
-            xs,
-            ys,
+            labels[mask],
+            overall[mask],
             color="black",
             linewidth=2.5,
             linestyle="--",
@@ -573,27 +1052,19 @@ def plot_accuracy_timeline(
 # ---------------------------------------------------------------------------
 
 
-def compute_overall_stats(enriched_bets: list[dict]) -> list[dict]:
+def compute_overall_stats(enriched_bets: list[Bet]) -> list[dict]:
     """Per-tool accuracy statistics across the entire period."""
-    totals: dict[str, int] = defaultdict(int)
-    corrects: dict[str, int] = defaultdict(int)
-    for bet in enriched_bets:
-        tool = bet["tool"]
-        totals[tool] += 1
-        if bet["is_correct"]:
-            corrects[tool] += 1
-    stats = []
-    for tool, total in totals.items():
-        correct = corrects[tool]
-        stats.append(
-            {
-                "tool": tool,
-                "total": total,
-                "correct": correct,
-                "accuracy": round(correct / total * 100, 1) if total > 0 else 0.0,
-            }
-        )
-    return sorted(stats, key=lambda x: x["total"], reverse=True)
+    totals = Counter(bet.tool for bet in enriched_bets)
+    corrects = Counter(bet.tool for bet in enriched_bets if bet.is_correct)
+    return [
+        {
+            "tool": tool,
+            "total": total,
+            "correct": corrects[tool],
+            "accuracy": round(corrects[tool] / total * 100, 1) if total > 0 else 0.0,
+        }
+        for tool, total in totals.most_common()
+    ]
 
 
 def print_summary(stats: list[dict], start_ts: int, end_ts: int) -> None:
@@ -629,6 +1100,7 @@ def print_summary(stats: list[dict], start_ts: int, end_ts: int) -> None:
 # ---------------------------------------------------------------------------
 
 
+@lru_cache(maxsize=4096)
 def _ts_to_date(ts: int) -> str:
     return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
 
@@ -750,17 +1222,19 @@ def main() -> None:
     print("=" * 60)
 
     print("\n[1/4] Fetching resolved bets...")
-    bets = fetch_bets_in_range(start_ts, end_ts)
+    # Mech requests for each agent start fetching as soon as its bets arrive
+    fetcher = MechRequestFetcher(start_ts)
+    bets = fetch_bets_in_range(start_ts, end_ts, on_bets=fetcher.add_bets)
     if not bets:
         print("No resolved bets found for the selected time range. Exiting.")
         sys.exit(0)
-    unique_agents = len({b["bettor"] for b in bets})
+    unique_agents = len({b.bettor for b in bets})
     print(f"  {len(bets)} bets from {unique_agents} unique agents.")
 
     print("\n[2/4] Enriching bets with mech tool data...")
-    enriched = enrich_bets_with_tool(bets, start_ts)
+    enriched = enrich_bets_with_tool(bets, fetcher)
     print(
-        f"  Done. {sum(1 for b in enriched if b['tool'] != 'unknown')} bets matched to a tool."
+        f"  Done. {sum(1 for b in enriched if b.tool != 'unknown')} bets matched to a tool."
     )
 
     print("\n[3/4] Computing statistics...")